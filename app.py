@@ -1,22 +1,61 @@
 import os
+import json
+import asyncio
 import uuid
-import re
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import capabilities
-import shelve # Import the shelve module
+import llm
+import metrics
+import sandbox
+import code_cache
+import hash_engine
+import browser_pool
+import vision
+import migrate_shelve
 import atexit # To handle graceful shutdown
+from memory_store import MemoryStore
+from semantic_memory import SemanticMemory
+from embeddings import default_embedder
+from fact_extractor import FactExtractor
 
 # --- Initialization ---
 app = Flask(__name__)
 CORS(app)
 
-memory_db = shelve.open('agent_memory', writeback=True)
+memory_db = MemoryStore()
+memory = SemanticMemory(memory_db, default_embedder())
+fact_extractor = FactExtractor(memory)
+# When a plain question is this close to a stored fact, answer it from memory.
+MEMORY_AUTO_RECALL_SCORE = float(os.getenv("MEMORY_AUTO_RECALL_SCORE", "0.65"))
+# JSON-RPC batches: maximum items per batch and items processed at the same time.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+# Capability plugins whose heavy dependencies are imported in the background at startup ("all" or e.g. "browse,image").
+CAPABILITIES_PRELOAD = os.getenv("CAPABILITIES_PRELOAD", "")
 
 def close_db():
     memory_db.close()
+    browser_pool.pool.close()
+    hash_engine.engine.close()
 atexit.register(close_db)
 
+# Finish extractions interrupted by the last shutdown or abandoned by a stopped worker, and embed
+# facts stored before semantic recall existed or under a different embedding model.
+llm.background(fact_extractor.resume())
+llm.background(memory.backfill())
+# Start the code sandbox workers ahead of the first code request.
+asyncio.run_coroutine_threadsafe(sandbox.pool.start(), llm.get_loop())
+# Fork the hash workers now, while the process is still small.
+asyncio.run_coroutine_threadsafe(hash_engine.engine.start(), llm.get_loop())
+# Launch the headless browser sessions in the background so interactive tasks find one ready;
+# otherwise the first interactive page launches them.
+if os.getenv("BROWSER_POOL_WARM", "0") == "1":
+    browser_pool.pool.warm_up()
+# Otherwise each plugin imports its dependencies on its first request.
+if CAPABILITIES_PRELOAD:
+    capabilities.warm_up(None if CAPABILITIES_PRELOAD == "all" else [name.strip() for name in CAPABILITIES_PRELOAD.split(',')])
+
 
 @app.route('/.well-known/agent-card.json', methods=['GET'])
 def agent_card():
@@ -37,84 +76,217 @@ def agent_card():
             "web browsing",
             "code execution",
             "memory"
-        ]
+        ],
+        "methods": ["message/send", "message/stream"],
+        "streaming": True
     }
     return jsonify(card)
 
-@app.route('/', methods=['POST'])
-def handle_message():
+def match_message(parts: list):
+    """
+    Finds the first text and image parts in one pass and routes them; None if there are neither.
+    Image-only messages get a default prompt.
+    """
+    text_part = image_part = None
+    for part in parts:
+        kind = part.get('kind')
+        if kind == 'text' and text_part is None:
+            text_part = part
+        elif kind == 'image' and image_part is None:
+            image_part = part
+        if text_part is not None and image_part is not None:
+            break
+    if text_part is None and image_part is None:
+        return None
+    text = (text_part or {}).get('text') or ('Describe this image.' if image_part is not None else '')
+    return capabilities.router.match(text, image=image_part)
+
+async def process_message(message: dict, stream: bool = False):
+    """
+    Routes one A2A message to a capability. Returns None when the message has no usable parts.
+    With stream=True, routes that generate text with an LLM return an async iterator of chunks.
+    """
+    parts = message.get('parts', [])
+    with metrics.stage('routing'):
+        match = match_message(parts)
+    if match is None:
+        return None
+    metrics.annotate(match.route.name)
+    return await match.route.handler(match, parts=parts, memory=memory, fact_extractor=fact_extractor, stream=stream, auto_recall_score=MEMORY_AUTO_RECALL_SCORE)
+
+def normalize_text(text) -> str:
+    return str(text).replace('*', '').lower().strip()
+
+class StreamNormalizer:
+    """Applies normalize_text() to a stream chunk by chunk: whitespace is held back until it is known not to be trailing."""
+
+    def __init__(self):
+        self.started = False
+        self.pending_space = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self.pending_space + chunk.replace('*', '').lower()
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        body = text.rstrip()
+        self.pending_space = text[len(body):]
+        return body
+
+async def stream_message(message: dict, metadata: dict = None):
+    """Yields normalized text deltas for a message; routes without streaming support yield their whole result once."""
+    with metrics.trace((metadata or {}).get('traceId')) as trace:
+        status = "500"
+        try:
+            result = await process_message(message, stream=True)
+            if result is None:
+                status = "400"
+                raise ValueError("Invalid params: No valid message parts found")
+            normalizer = StreamNormalizer()
+            if not hasattr(result, '__aiter__'):
+                delta = normalizer.feed(str(result))
+                if delta: yield delta
+            else:
+                async for chunk in result:
+                    delta = normalizer.feed(chunk)
+                    if delta: yield delta
+            status = "200"
+        except llm.Overloaded:
+            status = "503"
+            raise
+        finally:
+            metrics.observe_request(trace, status)
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+def stream_response(message: dict, request_id, metadata: dict = None):
+    """Server-Sent Events for message/stream: an artifact-update event per text delta, then a final status-update with the full message."""
+    def events():
+        artifact_id = str(uuid.uuid4())
+        text = []
+        try:
+            for delta in llm.iterate(stream_message(message, metadata)):
+                text.append(delta)
+                update = {"kind": "artifact-update", "artifact": {"artifactId": artifact_id, "parts": [{"kind": "text", "text": delta}]}, "append": True, "lastChunk": False}
+                yield sse_event({"jsonrpc": "2.0", "result": update, "id": request_id})
+            response_message = {"messageId": str(uuid.uuid4()), "role": "agent", "parts": [{"kind": "text", "text": ''.join(text)}]}
+            status = {"kind": "status-update", "status": {"state": "completed", "message": response_message}, "final": True}
+            yield sse_event({"jsonrpc": "2.0", "result": status, "id": request_id})
+        except ValueError as e:
+            yield sse_event({"jsonrpc": "2.0", "error": {"code": -32602, "message": str(e)}, "id": request_id})
+        except llm.Overloaded as e:
+            yield sse_event({"jsonrpc": "2.0", "error": {"code": -32001, "message": f"Server busy: {e}"}, "id": request_id})
+        except Exception as e:
+            yield sse_event({"jsonrpc": "2.0", "error": {"code": -32000, "message": f"Server error: {e}"}, "id": request_id})
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    cache = llm.client.cache
+    return jsonify({"llm_cache": cache.stats() if cache else None, "code_cache": code_cache.cache.stats(), "models": llm.client.stats(), "vision": vision.pipeline.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def request_metadata(obj) -> dict:
+    """The optional metadata object of a request's params (traceId, trace)."""
+    metadata = obj.get('metadata') if isinstance(obj, dict) else None
+    return metadata if isinstance(metadata, dict) else {}
+
+def error_response(code: int, message: str, request_id):
+    return {"jsonrpc": "2.0", "error": {"code": code, "message": message}, "id": request_id}
+
+async def execute_request(data) -> tuple:
+    """
+    Runs one JSON-RPC message/send request under a trace and returns (response body, HTTP status).
+    The per-stage timings are added to the response message's metadata when METRICS_TRACE_RESPONSES
+    is set or the request's params.metadata has "trace": true.
+    """
+    metadata = request_metadata(data.get('params') if isinstance(data, dict) else None)
+    with metrics.trace(metadata.get('traceId')) as trace:
+        body, status = await run_request(data)
+        metrics.observe_request(trace, str(status))
+        if trace is not None and status == 200 and (metrics.METRICS_TRACE_RESPONSES or metadata.get('trace') is True):
+            body['result']['message']['metadata'] = trace.as_dict()
+    return body, status
+
+async def run_request(data) -> tuple:
+    request_id = data.get('id') if isinstance(data, dict) else None
     try:
-        data = request.get_json()
         message = data['params']['message']
-        parts = message.get('parts', [])
-        request_id = data.get('id')
-        result_text = ""
-
-        image_part = next((p for p in parts if p.get('kind') == 'image'), None)
-        text_part = next((p for p in parts if p.get('kind') == 'text'), None)
-        
-        if image_part and text_part:
-            prompt = text_part.get('text', 'Describe this image.')
-            possible_keys = ['base64', 'data', 'content', 'image_data']
-            image_base64 = None
-            for key in possible_keys:
-                if key in image_part: image_base64 = image_part[key]; break
-            if not image_base64: result_text = "Error: Image part received but no valid image data key was found."
-            else: result_text = capabilities.understand_image(image_base64, prompt)
-
-        elif text_part:
-            original_prompt = text_part.get('text', '')
-            prompt_text = original_prompt.lower()
-            
-            recall_keywords = ['do you remember', 'what did i tell you', 'check your memory', 'what was paired with']
-            storage_keywords = ['remember that', 'remember this', 'store this', 'for future reference'] # Expanded keywords
-            code_keywords = ['calculate', 'compute', 'what is the result', 'program for', 'sum of squares']
-            url_match = re.search(r'(https?://\S+)', original_prompt)
-
-            if any(keyword in prompt_text for keyword in recall_keywords):
-                numbers_found = re.findall(r'\d+', original_prompt)
-                if not numbers_found:
-                    result_text = "I'm sorry, please specify a number for me to search for in my memory."
-                else:
-                    query = numbers_found[0]
-                    result_text = capabilities.recall_memories(query, original_prompt, memory_db)
-            
-            elif any(keyword in prompt_text for keyword in storage_keywords):
-                fact_extraction_prompt = f"From the user's request, extract only the core fact or piece of information they want me to remember. For example, from 'Please remember this for later: the secret code is 1234', you would extract 'the secret code is 1234'. From the request '{original_prompt}', extract the core fact."
-                response = capabilities.client.chat(model='llama3', messages=[{'role': 'user', 'content': fact_extraction_prompt}], options={'temperature': 0.0})
-                fact_to_remember = response['message']['content'].strip().replace('"', '')
-                
-                fact_key = f"fact_{len(memory_db) + 1}"
-                memory_db[fact_key] = fact_to_remember
-                result_text = "OK, I've remembered that."
-            
-            elif any(keyword in prompt_text for keyword in code_keywords):
-                result_text = capabilities.code_interpreter(original_prompt)
-            
-            elif "browse" in prompt_text or url_match:
-                url = url_match.group(0).strip() if url_match else None
-                query = original_prompt.replace(url, '').strip() if url else original_prompt
-                if not url: result_text = "Please provide a URL to browse."
-                else: result_text = capabilities.smart_browse(url=url, query=query)
-            
-            elif "hash" in prompt_text:
-                params = capabilities.get_hash_params(original_prompt)
-                if "error" in params: result_text = params["error"]
-                else: result_text = capabilities.execute_hash_sequence(**params)
-            
-            else:
-                result_text = capabilities.general_qa(original_prompt)
-        
-        else:
-            return jsonify({"jsonrpc": "2.0", "error": {"code": -32602, "message": "Invalid params: No valid message parts found"}, "id": request_id}), 400
+        result_text = await process_message(message)
+        if result_text is None:
+            return error_response(-32602, "Invalid params: No valid message parts found", request_id), 400
 
-        normalized_text = str(result_text).replace('*', '').lower().strip()
+        normalized_text = normalize_text(result_text)
         response_message = {"messageId": str(uuid.uuid4()), "role": "agent", "parts": [{"kind": "text", "text": normalized_text}]}
         json_rpc_response = { "jsonrpc": "2.0", "result": {"message": response_message}, "id": request_id }
-        return jsonify(json_rpc_response)
+        return json_rpc_response, 200
 
+    except llm.Overloaded as e:
+        return error_response(-32001, f"Server busy: {e}", request_id), 503
     except Exception as e:
-        return jsonify({"jsonrpc": "2.0", "error": {"code": -32000, "message": f"Server error: {e}"}, "id": data.get('id') if 'data' in locals() else None}), 500
+        return error_response(-32000, f"Server error: {e}", request_id), 500
+
+def request_model(data) -> str:
+    """The model a request will mostly use (from its route), so batch items can be grouped per model."""
+    try:
+        match = match_message(data['params']['message'].get('parts', []))
+    except (KeyError, TypeError, AttributeError):
+        return ""
+    return (match.route.model or "") if match else ""
+
+async def execute_batch(items: list) -> list:
+    """
+    Runs the items of a JSON-RPC batch concurrently (at most BATCH_CONCURRENCY at a time) and
+    returns their responses in request order; notifications (no id) get no response. Items are
+    admitted grouped by model, so the requests for one model reach Ollama together.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(data):
+        if not isinstance(data, dict):
+            return error_response(-32600, "Invalid Request", None)
+        if data.get('method') == 'message/stream':
+            return error_response(-32600, "message/stream is not supported inside a batch", data.get('id'))
+        async with semaphore:
+            body, _ = await execute_request(data)
+        return body
+
+    order = sorted(range(len(items)), key=lambda i: request_model(items[i]))
+    tasks = {i: asyncio.ensure_future(run(items[i])) for i in order}
+    responses = await asyncio.gather(*(tasks[i] for i in range(len(items))))
+    return [response for data, response in zip(items, responses) if not isinstance(data, dict) or 'id' in data]
+
+@app.route('/', methods=['POST'])
+def handle_message():
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify(error_response(-32700, "Parse error", None)), 400
+
+    if isinstance(data, list):
+        if not data:
+            return jsonify(error_response(-32600, "Invalid Request: empty batch", None)), 400
+        if len(data) > BATCH_MAX_SIZE:
+            return jsonify(error_response(-32600, f"Invalid Request: batch exceeds {BATCH_MAX_SIZE} items", None)), 400
+        responses = llm.run(execute_batch(data))
+        return (jsonify(responses), 200) if responses else ('', 204)
+
+    if isinstance(data, dict) and data.get('method') == 'message/stream':
+        try:
+            return stream_response(data['params']['message'], data.get('id'), request_metadata(data['params']))
+        except (KeyError, TypeError) as e:
+            return jsonify(error_response(-32602, f"Invalid params: {e}", data.get('id'))), 400
+
+    # The capability runs on the shared event loop; this worker thread only waits for its result.
+    body, status = llm.run(execute_request(data))
+    return jsonify(body), status
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    # Development server; serve.py runs several worker processes for production.
+    migrate_shelve.migrate_on_startup(memory_db)
+    app.run(host='0.0.0.0', port=8080, debug=os.getenv("FLASK_DEBUG", "0") == "1")
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+A stand-in for the Ollama HTTP API (/api/chat, /api/embed, /api/tags) with configurable latency,
+token rate and failure injection, so benchmarks run without models or a GPU.
+
+    python bench/fake_ollama.py --port 11434 --latency 0.2 --token-rate 50 --fail-rate 0.01
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = "the agent answers questions about pages images memories and code with short direct sentences".split()
+EMBEDDING_DIM = 64
+
+
+def reply_for(body: dict, tokens: int) -> str:
+    """A plausible answer for the app's prompts: JSON facts, a Python program, or `tokens` words of text."""
+    messages = body.get('messages') or []
+    system = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+    last = messages[-1].get('content', '') if messages else ''
+    if body.get('format') == 'json':
+        facts = re.findall(r'^\d+\. (.*)$', last, re.M) or [last]
+        return json.dumps({"facts": [fact.replace('Remember that', '').strip() for fact in facts]})
+    if 'Python programmer' in system:
+        return "print(sum(i * i for i in range(1, 11)))"
+    if 'extract the core fact' in last:
+        return last.rsplit("'", 2)[-2] if last.count("'") >= 2 else last
+    return ' '.join(WORDS[i % len(WORDS)] for i in range(tokens)) + '.'
+
+
+def embedding(text: str) -> list:
+    digest = hashlib.sha256(text.encode('utf-8')).digest() * (EMBEDDING_DIM // 32)
+    return [(b - 127.5) / 127.5 for b in digest[:EMBEDDING_DIM]]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json(200, {"models": []})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not fake.admit():
+            time.sleep(fake.latency)
+            self._send_json(500, {"error": "injected failure"})
+            return
+        if self.path == '/api/embed':
+            inputs = body.get('input')
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            time.sleep(fake.latency)
+            self._send_json(200, {"model": body.get('model'), "embeddings": [embedding(str(text)) for text in inputs]})
+        elif self.path == '/api/chat':
+            self._chat(fake, body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _chat(self, fake, body: dict):
+        pieces = [word + ' ' for word in reply_for(body, fake.tokens).split(' ')]
+        pieces[-1] = pieces[-1].rstrip()
+        model = body.get('model')
+        time.sleep(fake.latency)
+        if not body.get('stream', True):
+            time.sleep(len(pieces) / fake.token_rate)
+            self._send_json(200, {"model": model, "message": {"role": "assistant", "content": ''.join(pieces)}, "done": True, "eval_count": len(pieces)})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for piece in pieces:
+            self._chunk({"model": model, "message": {"role": "assistant", "content": piece}, "done": False})
+            time.sleep(1 / fake.token_rate)
+        self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True, "eval_count": len(pieces)})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, payload: dict):
+        line = json.dumps(payload).encode('utf-8') + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+class FakeOllama:
+    """
+    A threaded fake Ollama server. Every call waits `latency` seconds before its first token, then
+    produces `tokens` tokens at `token_rate` per second; a `fail_rate` fraction of calls get a 500.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.1, token_rate: float = 50.0,
+                 tokens: int = 32, fail_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self) -> bool:
+        """Counts a call and decides whether it fails."""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.fail_rate
+            self.failures += failed
+        return not failed
+
+    def start(self) -> str:
+        threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "failures": self.failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=50.0, help="tokens per second after the first")
+    parser.add_argument('--tokens', type=int, default=32, help="tokens per text answer")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of calls answered with HTTP 500")
+    args = parser.parse_args()
+    fake = FakeOllama(args.host, args.port, args.latency, args.token_rate, args.tokens, args.fail_rate)
+    print(f"Fake Ollama listening on {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
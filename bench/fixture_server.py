@@ -0,0 +1,95 @@
+"""
+A local HTTP server for browsing benchmarks: a generated article page (with an ETag, so the
+fetcher's revalidation path is exercised) and the files in fixtures/ (e.g. /ttt.html).
+
+    python bench/fixture_server.py --port 8000
+"""
+import os
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+
+def article_html(paragraphs: int = 60) -> str:
+    body = "\n".join(
+        f"<h2>Section {i}</h2><p>Paragraph {i} describes benchmark topic {i % 7} in enough words to fill a chunk "
+        f"of page content, with a <a href=\"/section/{i}\">link to section {i}</a>.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Benchmark Article</title>"
+        "<meta name=\"description\" content=\"A generated page for browsing benchmarks\"></head>"
+        f"<body><nav>Home | About</nav><main><h1>Benchmark Article</h1>{body}"
+        "<p>The release code is 20240101120000.</p></main><script>var ignored = 1;</script></body></html>"
+    )
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        if page is None:
+            path = os.path.join(FIXTURES_DIR, os.path.basename(self.path))
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+            with open(path, 'rb') as f:
+                page = f.read()
+        etag = '"' + hashlib.sha256(page).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(page)
+
+
+class FixtureServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.pages = {'/article.html': article_html().encode('utf-8')}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    server = FixtureServer(args.host, args.port)
+    print(f"Fixtures served on {server.url} (/article.html, /ttt.html)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Cold-start cost: wall time and peak RSS of a fresh interpreter importing `capabilities` (the
+routing and plugin layer) and `app` (the whole server), and which heavy dependencies each import
+pulled in.
+
+    python bench/import_bench.py --runs 5 --output import_results.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['capabilities', 'app']
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'bs4', 'lxml', 'requests', 'PIL', 'game_solver', 'ollama', 'numpy']
+
+# The child's report is the one stdout line starting with this; the imported modules may print too.
+RESULT_MARKER = 'IMPORT_BENCH_RESULT '
+# Runs in the child interpreter: imports one module and reports what it cost.
+CHILD = """
+import sys, json, time, resource
+start = time.perf_counter()
+__import__(sys.argv[1])
+seconds = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(sys.argv[3] + json.dumps({
+    "seconds": seconds,
+    "peak_rss_mb": peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024,
+    "modules": len(sys.modules),
+    "heavy": [name for name in sys.argv[2].split(',') if name in sys.modules],
+}))
+sys.stdout.flush()
+"""
+
+
+def measure(module: str, workdir: str) -> dict:
+    # Browser warm-up and plugin preloading are pinned to the server defaults (both off).
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1', BROWSER_POOL_WARM='0', CAPABILITIES_PRELOAD='',
+               OLLAMA_HOST='http://127.0.0.1:9', MEMORY_DB_PATH=os.path.join(workdir, 'memory.sqlite3'),
+               CODE_CACHE_PATH=os.path.join(workdir, 'code_cache.sqlite3'), FETCH_CACHE_DIR=os.path.join(workdir, 'pages'), LLM_CACHE_PATH='')
+    output = subprocess.run([sys.executable, '-c', CHILD, module, ','.join(HEAVY_MODULES), RESULT_MARKER], cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=120)
+    results = [line[len(RESULT_MARKER):] for line in output.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if not results:
+        raise RuntimeError(f"import {module} failed: {output.stderr.strip()[-500:]}")
+    return json.loads(results[-1])
+
+
+def run(module: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix="import-bench-")
+        try:
+            samples.append(measure(module, workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "seconds_median": statistics.median(s["seconds"] for s in samples),
+        "seconds_min": min(s["seconds"] for s in samples),
+        "peak_rss_mb_median": statistics.median(s["peak_rss_mb"] for s in samples),
+        "modules": samples[-1]["modules"],
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modules', default=','.join(MODULES), help="comma-separated modules to import")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules.split(','):
+        result = results[module] = run(module, args.runs)
+        print(f"{module:<14} {result['seconds_median'] * 1000:8.1f} ms (min {result['seconds_min'] * 1000:.1f})  "
+              f"{result['peak_rss_mb_median']:6.1f} MB peak RSS  {result['modules']} modules  heavy: {', '.join(result['heavy']) or '-'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
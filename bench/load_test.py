@@ -0,0 +1,277 @@
+"""
+Load test: starts the agent in-process against the fake Ollama server and the local fixture
+server, drives each capability route at the given concurrency levels and writes throughput,
+p50/p95/p99 latency and memory usage to a JSON file.
+
+    python bench/load_test.py --requests 100 --concurrency 1,8,32 --output bench_results.json
+    python bench/load_test.py --compare bench_results.json --output bench_results_new.json
+"""
+import io
+import os
+import sys
+import json
+import logging
+import time
+import base64
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_ollama import FakeOllama  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+# Run in this order, so recall finds what store remembered.
+SCENARIOS = ['general', 'store', 'recall', 'code', 'browse', 'hash', 'image', 'stream', 'batch']
+BATCH_ITEMS = 10
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process (server, clients and fakes together)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def test_images(count: int = 8) -> list:
+    from PIL import Image
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), (30 * i % 256, 90, 160)).save(buffer, 'PNG')
+        images.append(base64.b64encode(buffer.getvalue()).decode('ascii'))
+    return images
+
+
+class Workload:
+    """Builds the JSON-RPC payload for request i of a scenario. Prompts differ per request unless repeat=True."""
+
+    def __init__(self, fixture_url: str, repeat: bool = False):
+        self.fixture_url = fixture_url
+        self.repeat = repeat
+        self._images = None
+
+    def payload(self, scenario: str, i: int) -> dict:
+        n = 0 if self.repeat else i
+        if scenario == 'batch':
+            return [self._request(self._text(f"What is the capital of country {n}-{j}?"), f"{i}-{j}") for j in range(BATCH_ITEMS)]
+        if scenario == 'stream':
+            return self._request(self._text(f"Explain topic number {n} briefly."), i, method='message/stream')
+        if scenario == 'image':
+            if self._images is None:
+                self._images = test_images()
+            parts = [{"kind": "image", "data": self._images[i % len(self._images)]}, {"kind": "text", "text": f"What is in this image? ({n})"}]
+            return self._request(parts, i)
+        prompts = {
+            'general': f"What is the capital of country number {n}?",
+            'store': f"Remember that locker {n} holds item {n * 7}.",
+            'recall': f"Do you remember what locker {n} holds?",
+            'code': f"Calculate the sum of squares from 1 to {n + 10}.",
+            'browse': f"Browse {self.fixture_url}/article.html and tell me what section {n % 60} describes.",
+            'hash': f'Hash the string "bench {n}" with md5 then sha256, 100 rounds',
+        }
+        return self._request(self._text(prompts[scenario]), i)
+
+    @staticmethod
+    def _text(text: str) -> list:
+        return [{"kind": "text", "text": text}]
+
+    @staticmethod
+    def _request(parts: list, request_id, method: str = 'message/send') -> dict:
+        return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": {"message": {"role": "user", "parts": parts}}}
+
+
+def send(session, url: str, payload) -> tuple:
+    """Sends one request; returns (ok, latency seconds, time to first byte for streams)."""
+    start = time.perf_counter()
+    streaming = isinstance(payload, dict) and payload.get('method') == 'message/stream'
+    response = session.post(url, json=payload, stream=streaming, timeout=300)
+    first_byte = None
+    if streaming:
+        received = []
+        # chunk_size=None hands over data as it arrives instead of filling a buffer first.
+        for chunk in response.iter_content(chunk_size=None):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            received.append(chunk)
+        ok = response.status_code == 200 and b'"error"' not in b''.join(received)
+    else:
+        body = response.json() if response.content else []
+        items = body if isinstance(body, list) else [body]
+        ok = response.status_code == 200 and all('result' in item for item in items)
+    return ok, time.perf_counter() - start, first_byte
+
+
+def run_scenario(url: str, workload: Workload, scenario: str, requests_count: int, concurrency: int, first: int = 0) -> dict:
+    """Sends requests first .. first + requests_count - 1 of the scenario with `concurrency` clients."""
+    import requests
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        try:
+            return send(local.session, url, workload.payload(scenario, i))
+        except Exception:
+            return False, None, None
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(one, range(first, first + requests_count)))
+    duration = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency, _ in results if ok)
+    first_bytes = sorted(fb for ok, _, fb in results if ok and fb is not None)
+    stats = {
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "errors": sum(1 for ok, _, _ in results if not ok),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            **{f"p{p}": round(percentile(latencies, p) * 1000, 2) for p in (50, 95, 99)},
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "memory_mb": {"rss_before": round(rss_before, 1), "rss_after": round(rss_mb(), 1), "peak_rss": round(peak_rss_mb(), 1)},
+    }
+    if first_bytes:
+        stats["first_byte_ms"] = {f"p{p}": round(percentile(first_bytes, p) * 1000, 2) for p in (50, 95, 99)}
+    return stats
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(previous: dict, current: dict):
+    """Prints throughput and p95 changes for every scenario/concurrency present in both runs."""
+    print(f"\nCompared with {previous['meta'].get('commit') or 'previous run'}:")
+    print(f"{'scenario':>10} {'conc':>5} {'rps old':>9} {'rps new':>9} {'change':>8} {'p95 old':>9} {'p95 new':>9} {'change':>8}")
+    for key, new in current['results'].items():
+        old = previous['results'].get(key)
+        if not old:
+            continue
+        scenario, concurrency = key.split('@')
+        rps_change = (new['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0.0
+        p95_old, p95_new = old['latency_ms']['p95'], new['latency_ms']['p95']
+        p95_change = (p95_new / p95_old - 1) * 100 if p95_old else 0.0
+        print(f"{scenario:>10} {concurrency:>5} {old['throughput_rps']:>9.2f} {new['throughput_rps']:>9.2f} {rps_change:>+7.1f}% "
+              f"{p95_old:>9.1f} {p95_new:>9.1f} {p95_change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=100, help="requests per scenario and concurrency level")
+    parser.add_argument('--concurrency', default='1,8,32', help="comma-separated concurrency levels")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake model latency before the first token, in seconds")
+    parser.add_argument('--token-rate', type=float, default=200.0, help="fake model tokens per second")
+    parser.add_argument('--tokens', type=int, default=32, help="tokens per fake text answer")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of fake model calls that fail")
+    parser.add_argument('--repeat', action='store_true', help="send the same prompt every time (measures the cached path)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(',')]
+    output = os.path.abspath(args.output)
+    previous_path = os.path.abspath(args.compare) if args.compare else None
+    random.seed(args.seed)
+
+    fake = FakeOllama(latency=args.latency, token_rate=args.token_rate, tokens=args.tokens, fail_rate=args.fail_rate, seed=args.seed)
+    fixtures = FixtureServer()
+    workdir = tempfile.mkdtemp(prefix="agent-bench-")
+    # The app reads its configuration at import time, so the environment is set up first.
+    os.environ.update({
+        "OLLAMA_HOST": fake.start(),
+        "MEMORY_DB_PATH": os.path.join(workdir, "memory.sqlite3"),
+        "CODE_CACHE_PATH": os.path.join(workdir, "code_cache.sqlite3"),
+        "FETCH_CACHE_DIR": os.path.join(workdir, "pages"),
+        "LLM_CACHE_PATH": "",
+        "BROWSER_POOL_WARM": "0",
+    })
+    fixture_url = fixtures.start()
+    os.chdir(workdir)
+
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    import app as agent
+    server = make_server('127.0.0.1', 0, agent.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="agent", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    workload = Workload(fixture_url, repeat=args.repeat)
+
+    results = {}
+    # Request numbers keep counting across runs, so a later run does not replay (and hit the cache for) earlier prompts.
+    sent = 0
+    print(f"{'scenario':>10} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MB':>8}")
+    for scenario in scenarios:
+        for concurrency in levels:
+            stats = run_scenario(url, workload, scenario, args.requests, concurrency, sent)
+            sent += args.requests
+            results[f"{scenario}@{concurrency}"] = dict(stats, scenario=scenario)
+            latency = stats['latency_ms']
+            print(f"{scenario:>10} {concurrency:>5} {stats['throughput_rps']:>9.2f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} "
+                  f"{latency['p99']:>9.1f} {stats['errors']:>7} {stats['memory_mb']['rss_after']:>8.1f}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        "fake_ollama": fake.stats(),
+        "results": results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if previous_path:
+        with open(previous_path) as f:
+            compare(json.load(f), report)
+
+    server.shutdown()
+    fixtures.stop()
+    fake.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Routing cost per request as routes are added: the compiled router against the keyword chain it
+replaced (lowercase the prompt, then `any(keyword in prompt ...)` per route).
+
+    python bench/router_bench.py [--routes 6,50,200,1000] [--number 2000]
+"""
+import os
+import re
+import sys
+import random
+import string
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from router import Router, Route  # noqa: E402
+
+BASE_ROUTES = [
+    ('recall', ['do you remember', 'what did i tell you', 'check your memory', 'what was paired with'], ()),
+    ('store', ['remember that', 'remember this', 'store this', 'for future reference'], ()),
+    ('code', ['calculate', 'compute', 'what is the result', 'program for', 'sum of squares'], ()),
+    ('browse', ['browse'], ('url',)),
+    ('hash', ['hash'], ()),
+]
+PROMPTS = [
+    "Do you remember what was paired with 42?",
+    "Remember that the code for the blue door is 7731.",
+    "Compute the sum of squares of the first 100 integers.",
+    "Browse https://example.com/articles/2024 and tell me the headline.",
+    'Hash the string "hello world" with md5, then sha512.',
+    "What is the capital of France, and why did it become the capital?",
+]
+
+
+def random_keywords(rng: random.Random, count: int) -> list:
+    return [' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(2)) for _ in range(count)]
+
+
+def build_routes(total: int) -> list:
+    rng = random.Random(total)
+    routes = list(BASE_ROUTES)
+    for i in range(total - len(BASE_ROUTES) - 1):
+        routes.append((f'extra{i}', random_keywords(rng, 4), ()))
+    return routes
+
+
+def compiled_router(routes: list) -> Router:
+    router = Router()
+    for priority, (name, keywords, triggers) in enumerate(reversed(routes)):
+        router.add(Route(name, None, keywords, triggers, priority))
+    router.add(Route('general', None), fallback=True)
+    router.compile()
+    return router
+
+
+def keyword_chain(routes: list):
+    url_pattern = re.compile(r'(https?://\S+)')
+
+    def route(prompt: str) -> str:
+        prompt_text = prompt.lower()
+        url_match = url_pattern.search(prompt)
+        for name, keywords, triggers in routes:
+            if any(keyword in prompt_text for keyword in keywords) or (triggers and url_match):
+                if name == 'recall':
+                    re.findall(r'\d+', prompt)
+                return name
+        return 'general'
+    return route
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--routes', default='6,50,200,1000', help="comma-separated route counts (including the built-in six)")
+    parser.add_argument('--number', type=int, default=2000, help="routing calls per prompt and measurement")
+    args = parser.parse_args()
+
+    print(f"{'routes':>7} {'keywords':>9} {'compiled us/req':>16} {'chain us/req':>13}")
+    for total in (int(n) for n in args.routes.split(',')):
+        routes = build_routes(total)
+        router = compiled_router(routes)
+        chain = keyword_chain(routes)
+        for prompt in PROMPTS:
+            assert router.match(prompt).route.name == chain(prompt), prompt
+        calls = args.number * len(PROMPTS)
+        compiled = min(timeit.repeat(lambda: [router.match(p) for p in PROMPTS], number=args.number, repeat=3)) / calls
+        naive = min(timeit.repeat(lambda: [chain(p) for p in PROMPTS], number=args.number, repeat=3)) / calls
+        keywords = sum(len(k) for _, k, _ in routes)
+        print(f"{total:>7} {keywords:>9} {compiled * 1e6:>16.2f} {naive * 1e6:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
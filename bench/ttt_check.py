@@ -0,0 +1,74 @@
+"""
+Plays the local Tic-Tac-Toe fixture (fixtures/ttt.html) end to end: interactive_browse on its own,
+then smart_browse racing it against the static read (answered by the fake Ollama server). Needs
+Firefox and geckodriver; without Firefox it reports the check as skipped.
+
+    python bench/ttt_check.py --runs 3
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_ollama import FakeOllama  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+
+def is_code(result: str) -> bool:
+    return len(result) == 14 and result.isdigit() and result.startswith(datetime.utcnow().strftime('%Y%m%d'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=1, help="games played by each check")
+    args = parser.parse_args()
+    if not shutil.which('firefox'):
+        print("Skipped: Firefox is not installed")
+        return 0
+
+    fake = FakeOllama(latency=0.5)
+    fixtures = FixtureServer()
+    workdir = tempfile.mkdtemp(prefix="ttt-check-")
+    # Modules read their configuration at import time, so the environment is set up first.
+    os.environ.update({
+        "OLLAMA_HOST": fake.start(),
+        "FETCH_CACHE_DIR": os.path.join(workdir, "pages"),
+        "BROWSER_POOL_SIZE": "1",
+    })
+    page = f"{fixtures.start()}/ttt.html"
+
+    import llm
+    import browser_pool
+    from capabilities import browse
+    # The fixture stands in for the real game page, so it gets the same handler.
+    browse.interactive_handler(r'/ttt\.html$')(browse.interactive_browse)
+
+    failures = 0
+    checks = [
+        ('interactive_browse', lambda: browse.interactive_browse(page, "")),
+        ('smart_browse', lambda: llm.run(browse.smart_browse(page, "What is the code?"))),
+    ]
+    try:
+        for name, check in checks:
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = check()
+                ok = is_code(result)
+                failures += not ok
+                print(f"{name:<20} {'ok' if ok else 'FAILED':<7} {time.perf_counter() - start:6.2f} s  {result}")
+    finally:
+        browser_pool.pool.close()
+        fixtures.stop()
+        fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+import metrics
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") == "1"
+# Seconds to wait for a free session before giving up.
+BROWSER_LEASE_TIMEOUT = float(os.getenv("BROWSER_LEASE_TIMEOUT", "60"))
+# Sessions are restarted after this many leases to bound memory growth in the browser.
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def driver_path() -> str:
+    """Resolves geckodriver once per process (GECKODRIVER_PATH skips the webdriver_manager lookup)."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            from webdriver_manager.firefox import GeckoDriverManager
+            _driver_path = os.getenv("GECKODRIVER_PATH") or GeckoDriverManager().install()
+    return _driver_path
+
+
+class Session:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Pre-launched Firefox sessions leased one request at a time. A session is reset (cookies,
+    storage, blank page) when it is returned, and replaced in the background if the reset fails
+    or it has been used BROWSER_MAX_USES times.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, headless: bool = BROWSER_HEADLESS):
+        self.size = size
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def _launch(self) -> Session:
+        # selenium is only imported once a browser is actually needed.
+        from selenium import webdriver
+        from selenium.webdriver.firefox.options import Options as FirefoxOptions
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+        options = FirefoxOptions()
+        if self.headless:
+            options.add_argument("-headless")
+        return Session(webdriver.Firefox(service=FirefoxService(driver_path()), options=options))
+
+    def _add_session(self):
+        try:
+            self._idle.put(self._launch())
+        except Exception as e:
+            with self._lock:
+                self._count -= 1
+            print(f"Browser launch error: {e}")
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._count >= self.size:
+                return False
+            self._count += 1
+            return True
+
+    def warm_up(self):
+        """Launches sessions in background threads until the pool is full."""
+        while self._reserve():
+            threading.Thread(target=self._add_session, daemon=True).start()
+
+    @contextmanager
+    def lease(self, timeout: float = BROWSER_LEASE_TIMEOUT):
+        with metrics.stage('browser_lease'):
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve():
+                    try:
+                        session = self._launch()
+                    except Exception:
+                        with self._lock:
+                            self._count -= 1
+                        raise
+                else:
+                    session = self._idle.get(timeout=timeout)
+        try:
+            yield session.driver
+        finally:
+            session.uses += 1
+            self._release(session)
+
+    def _release(self, session: Session):
+        if session.uses < BROWSER_MAX_USES:
+            try:
+                session.driver.delete_all_cookies()
+                session.driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+                session.driver.get("about:blank")
+                self._idle.put(session)
+                return
+            except Exception:
+                pass
+        self._discard(session)
+        if self._reserve():
+            threading.Thread(target=self._add_session, daemon=True).start()
+
+    def _discard(self, session: Session):
+        with self._lock:
+            self._count -= 1
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+pool = BrowserPool()
@@ -0,0 +1,31 @@
+"""
+Capability plugins. Importing the package registers every plugin's routes on the shared router;
+each plugin imports its heavy dependencies (selenium, BeautifulSoup, PIL, ...) on first use and
+lists them in DEPENDENCIES so warm_up() can load them ahead of time.
+"""
+import importlib
+import threading
+from router import router
+from . import image, memory, interpreter, browse, hashing, general
+
+PLUGINS = {plugin.__name__.rsplit('.', 1)[-1]: plugin for plugin in (image, memory, interpreter, browse, hashing, general)}
+
+
+def preload(names=None):
+    """Imports the dependencies of the named plugins (all by default), skipping any that fail."""
+    for name in names or PLUGINS:
+        if name not in PLUGINS:
+            print(f"Preload error: unknown capability plugin '{name}'")
+            continue
+        for module in PLUGINS[name].DEPENDENCIES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Preload error for {module}: {e}")
+
+
+def warm_up(names=None) -> threading.Thread:
+    """Runs preload() in a background thread, so startup does not wait for it."""
+    thread = threading.Thread(target=preload, args=(names,), name="capabilities-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,184 @@
+"""
+Browsing: a static read of the page, raced against an interactive browser session for pages with a
+registered interactive handler.
+"""
+import re
+import asyncio
+import threading
+from datetime import datetime
+import metrics
+from llm import client
+from router import router
+
+# requests/BeautifulSoup (fetcher) and selenium are imported on the first browse request.
+DEPENDENCIES = ('fetcher', 'game_solver', 'browser_pool', 'selenium.webdriver', 'selenium.webdriver.support.ui',
+                'selenium.webdriver.support.expected_conditions', 'webdriver_manager.firefox')
+
+# Interactive handlers by URL pattern, tried in registration order: blocking handler(url, query, cancel)
+# functions that drive a pooled browser session and return early once the `cancel` event is set.
+INTERACTIVE_HANDLERS = []
+
+def interactive_handler(pattern: str):
+    """Decorator registering an interactive handler for URLs the regex pattern matches (case-insensitively)."""
+    def register(handler):
+        INTERACTIVE_HANDLERS.append((re.compile(pattern, re.IGNORECASE), handler))
+        return handler
+    return register
+
+def find_interactive_handler(url: str):
+    for pattern, handler in INTERACTIVE_HANDLERS:
+        if pattern.search(url):
+            return handler
+    return None
+
+def is_answer(result: str) -> bool:
+    """Whether a stage's result looks like the answer: a 14-digit code, not a not-found reply."""
+    return bool(result) and "Information not found" not in result and re.search(r'\d{14}', result) is not None
+
+def find_best_move(board):
+    """Optimal move for X, looked up in the precomputed Tic-Tac-Toe table."""
+    import game_solver
+    return game_solver.tic_tac_toe_move(board)
+
+def read_page(url: str, query: str) -> str:
+    """Fetches a page (through the pooled, cached fetcher) and keeps the content most relevant to the query."""
+    import fetcher
+    page = fetcher.fetcher.fetch(url)
+    return fetcher.select_content(fetcher.extract_chunks(page.text), query)
+
+async def static_browse(url: str, query: str) -> str:
+    """Stage 1: Fetches and analyzes the static content of a page."""
+    try:
+        page_content = await asyncio.to_thread(read_page, url, query)
+        if not page_content:
+            return "Web browsing error: Could not extract any text from the page."
+        
+        system_prompt = "You are a web page analysis assistant. Based on the provided PAGE CONTENT (the page's visible text, link targets, element attributes and HTML comments), your job is to answer the user's QUERY. Respond with only the specific information requested. If the information cannot be found, respond with 'Information not found.'"
+        llm_prompt = f"PAGE CONTENT: \"\"\"{page_content}\"\"\"\n\nQUERY: \"{query}\""
+        
+        response = await client.chat(
+            model='llama3', messages=[{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': llm_prompt}]
+        )
+        return response['message']['content']
+    except Exception as e:
+        return f"Static browsing error: {e}"
+
+# Reads the board and the congratulations text in one round trip (innerText, like WebElement.text).
+GAME_SNAPSHOT_FN = """
+function snapshot() {
+    const congrats = document.getElementById('congratulations');
+    return {
+        board: Array.from(document.getElementsByClassName('cell'), c => (c.innerText ?? c.textContent ?? '').trim().toUpperCase()),
+        text: congrats ? (congrats.innerText ?? congrats.textContent ?? '') : ''
+    };
+}
+"""
+GAME_SNAPSHOT_JS = GAME_SNAPSHOT_FN + "return snapshot();"
+
+# Resolves as soon as a DOM mutation shows the opponent's reply, a finished board, or a 14-digit code.
+WAIT_FOR_GAME_CHANGE_JS = GAME_SNAPSHOT_FN + """
+const marks = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+const ready = s => /\\b\\d{14}\\b/.test(s.text) || s.board.filter(c => c).length >= marks || s.board.every(c => c);
+let current = snapshot();
+if (ready(current)) return done(current);
+const observer = new MutationObserver(() => {
+    current = snapshot();
+    if (ready(current)) { observer.disconnect(); clearTimeout(timer); done(current); }
+});
+observer.observe(document.body, {subtree: true, childList: true, characterData: true, attributes: true});
+const timer = setTimeout(() => { observer.disconnect(); done(snapshot()); }, timeoutMs);
+"""
+
+GAME_CHANGE_TIMEOUT_MS = 5000
+
+@interactive_handler(r'ttt\.puppy9\.com')
+def interactive_browse(url: str, query: str, cancel: threading.Event = None) -> str:
+    """Uses Selenium and the precomputed Tic-Tac-Toe table to play and win Tic-Tac-Toe in a pooled browser session."""
+    cancel = cancel or threading.Event()
+    try:
+        import browser_pool
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        with browser_pool.pool.lease() as driver:
+            with metrics.stage('browser_load'):
+                driver.get(url)
+                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "cell")))
+                driver.set_script_timeout(GAME_CHANGE_TIMEOUT_MS / 1000 + 5)
+                snapshot = driver.execute_script(GAME_SNAPSHOT_JS)
+
+            for turn in range(5):
+                # The static read already answered; the pool resets the session on release.
+                if cancel.is_set():
+                    return "Interactive browsing cancelled."
+                board_state = [cell or '_' for cell in snapshot['board']]
+
+                move_index = find_best_move(board_state)
+                if move_index == -1: break
+                
+                with metrics.stage('browser_move'):
+                    cells = driver.find_elements(By.CLASS_NAME, "cell")
+                    if 0 <= move_index < len(cells) and cells[move_index].is_enabled():
+                        cells[move_index].click()
+                    else:
+                        return "Error: Minimax chose an invalid square, which should not happen."
+
+                    # Wait for the page to react (opponent move, game over or the code) instead of sleeping
+                    marks_expected = sum(1 for cell in board_state if cell != '_') + 2
+                    snapshot = driver.execute_async_script(WAIT_FOR_GAME_CHANGE_JS, marks_expected, GAME_CHANGE_TIMEOUT_MS)
+
+                # Check for win condition
+                expected_date = datetime.utcnow().strftime('%Y%m%d')
+                match = re.search(r'\b(\d{14})\b', snapshot['text'])
+                if match and match.group(1).startswith(expected_date):
+                    return match.group(1)
+
+            return "Error: Played the game but did not find the code."
+    except Exception as e:
+        return f"Interactive browsing error: {e}"
+
+async def _static_stage(url: str, query: str) -> str:
+    async with metrics.stage('browse_static'):
+        return await static_browse(url, query)
+
+async def _interactive_stage(handler, url: str, query: str, cancel: threading.Event) -> str:
+    try:
+        async with metrics.stage('browse_interactive'):
+            return await asyncio.to_thread(handler, url, query, cancel)
+    except Exception as e:
+        return f"Interactive browsing error: {e}"
+
+async def smart_browse(url: str, query: str) -> str:
+    """
+    Reads the page statically and, when an interactive handler matches the URL, plays it in a browser
+    session at the same time. The first stage to return an answer wins and the other is cancelled;
+    if neither finds one, the interactive result is returned.
+    """
+    handler = find_interactive_handler(url)
+    if handler is None:
+        static_result = await _static_stage(url, query)
+        if is_answer(static_result):
+            return static_result
+        return f"Static analysis did not find the answer ('{query}'). This page is not a known interactive task."
+
+    cancel = threading.Event()
+    interactive = asyncio.create_task(_interactive_stage(handler, url, query, cancel))
+    pending = {asyncio.create_task(_static_stage(url, query)), interactive}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if is_answer(task.result()):
+                    return task.result()
+        return interactive.result()
+    finally:
+        # The handler's thread cannot be interrupted, so it is told to stop at its next step.
+        cancel.set()
+        for task in pending:
+            task.cancel()
+
+@router.route('browse', keywords=['browse'], triggers=['url'], priority=30, model='llama3')
+async def route_browse(match, **context):
+    if not match.urls: return "Please provide a URL to browse."
+    url = match.urls[0].strip()
+    return await smart_browse(url=url, query=match.text.replace(url, '').strip())
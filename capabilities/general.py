@@ -0,0 +1,27 @@
+"""General questions: the fallback route, answered from memory when a stored fact is close enough."""
+from llm import client
+from router import router
+from .memory import answer_from_memories
+
+# Nothing to preload: general questions only need the Ollama client.
+DEPENDENCIES = ()
+
+AGENT_SYSTEM_PROMPT = """
+Begin your response with a concise direct answer to the prompt's main question. Use clear, straightforward language and contractions. Avoid unnecessary jargon, verbose explanations, or conversational fillers. Structure the response logically. Use markdown headings (##) to create distinct sections if the response is more than a few paragraphs or covers different points, topics, or steps. If a response uses markdown headings, add horizontal lines to separate sections. Prioritize coherence over excessive fragmentation. When appropriate bold key words in the response.
+"""
+
+async def general_qa(prompt: str, stream: bool = False):
+    """Answers a question. With stream=True, returns an async iterator of answer chunks instead of the text."""
+    messages = [{'role': 'system', 'content': AGENT_SYSTEM_PROMPT}, {'role': 'user', 'content': prompt}]
+    if stream:
+        return client.stream_chat(model='llama3', messages=messages, cache=True)
+    response = await client.chat(model='llama3', messages=messages, cache=True)
+    return response['message']['content']
+
+@router.route('general', fallback=True, model='llama3')
+async def route_general(match, memory, stream=False, auto_recall_score=None, **context):
+    remembered = []
+    if memory.has_vectors():
+        remembered = await memory.recall(match.text, min_score=auto_recall_score)
+    if remembered: return await answer_from_memories(remembered, match.text, stream)
+    return await general_qa(match.text, stream)
@@ -0,0 +1,27 @@
+"""Hash chains over quoted strings and attached files."""
+import asyncio
+import metrics
+import hash_engine
+from router import router
+
+DEPENDENCIES = ()
+
+@router.route('hash', keywords=['hash'], priority=20)
+async def route_hash(match, parts=(), **context):
+    # Each quoted string and each attached file is one chain; file bytes are decoded and hashed chunk by chunk.
+    files = [p['file'] for p in parts if p.get('kind') == 'file' and isinstance(p.get('file'), dict)]
+    if not ((match.quoted or files) and match.algorithms):
+        return "Regex failed to find the required string and algorithms in the prompt."
+    if any('bytes' not in file for file in files):
+        return "Error: Only files sent inline as bytes can be hashed."
+    try:
+        steps = [hash_engine.parse_step(algo) for algo in match.algorithms]
+        rounds = match.rounds[0] if match.rounds else 1
+        jobs = [hash_engine.engine.chain(text.encode('utf-8'), steps, rounds) for text in match.quoted]
+        jobs += [hash_engine.engine.stream(hash_engine.base64_chunks(file['bytes']), steps, rounds) for file in files]
+        async with metrics.stage('hash'):
+            return '\n'.join(await asyncio.gather(*jobs))
+    except hash_engine.HashError as e:
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Hashing execution error: {e}"
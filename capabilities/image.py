@@ -0,0 +1,32 @@
+"""Questions about images, answered by the vision model through vision.py."""
+import base64
+import llm
+import vision
+from router import router
+
+# PIL is imported by vision.py when the first image is decoded.
+DEPENDENCIES = ('PIL.Image',)
+
+async def understand_image(image_base64: str, prompt: str) -> str:
+    """Answers a prompt about a base64 image with the vision model (validated, downscaled and cached by vision.py)."""
+    if not image_base64 or len(image_base64) < 10:
+        return "Error: Received an empty or invalid base64 string."
+    try:
+        image_bytes = base64.b64decode(image_base64)
+    except Exception as e:
+        return f"Image data processing error: {e}"
+    try:
+        return await vision.pipeline.describe(image_bytes, prompt)
+    except vision.ImageError as e:
+        return f"Image data processing error: {e}"
+    except llm.Overloaded:
+        raise
+    except Exception as e:
+        return f"Ollama model error: {e}"
+
+@router.route('image', image=True, priority=100, model=vision.VISION_MODEL)
+async def route_image(match, **context):
+    image_part = match.image
+    image_base64 = next((image_part[key] for key in ['base64', 'data', 'content', 'image_data'] if key in image_part), None)
+    if not image_base64: return "Error: Image part received but no valid image data key was found."
+    return await understand_image(image_base64, match.text)
@@ -0,0 +1,85 @@
+"""Computational prompts: the model writes a Python program and a sandbox worker runs it."""
+import metrics
+import sandbox
+import code_cache
+from llm import client
+from router import router
+
+DEPENDENCIES = ()
+
+async def get_math_expression(prompt: str) -> str:
+    system_prompt = "You are a calculator's assistant. Given a word problem, your only job is to return the raw mathematical expression needed to solve it."
+    response = await client.chat(model='llama3', messages=[{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': prompt}], cache=True)
+    return response['message']['content'].strip().replace("`", "")
+
+def use_calculator(expression: str) -> str:
+    try:
+        allowed_chars = "0123456789+-*/(). "
+        if all(char in allowed_chars for char in expression):
+            return str(eval(expression))
+        else:
+            return "Error: Invalid characters in expression."
+    except Exception as e:
+        return f"Calculation error: {e}"
+
+CODE_MODEL = 'llama3'
+CODE_SYSTEM_PROMPT = """
+    You are a world-class Python programmer. The user will provide a prompt that requires a calculation or a programmatic solution.
+    Your task is to write a self-contained Python script that solves the user's prompt.
+    The script MUST print the final, single numerical answer to standard output.
+    Do not provide any explanation, commentary, or markdown formatting.
+    Only provide the raw Python code.
+    """
+
+async def generate_code(prompt: str) -> str:
+    response = await client.chat(
+        model=CODE_MODEL,
+        messages=[
+            {'role': 'system', 'content': CODE_SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ],
+        options={"temperature": 0.0}
+    )
+    code_to_execute = response['message']['content'].strip()
+    
+    # Clean the code if it's wrapped in markdown
+    if code_to_execute.startswith("```python"):
+        code_to_execute = code_to_execute[9:]
+    if code_to_execute.startswith("```"):
+        code_to_execute = code_to_execute[3:]
+    if code_to_execute.endswith("```"):
+        code_to_execute = code_to_execute[:-3]
+    return code_to_execute
+
+async def run_code(code: str) -> str:
+    """Executes code in an isolated, pre-started sandbox worker and returns its stripped stdout."""
+    async with metrics.stage('code_exec'):
+        execution = await sandbox.pool.run(code)
+    if execution.error:
+        raise RuntimeError(execution.error)
+    return execution.output.strip()
+
+async def code_interpreter(prompt: str) -> str:
+    """
+    Asks an LLM to generate Python code to solve a prompt, then executes the code
+    and returns the output. This is a powerful and versatile tool for computational tasks.
+    """
+    try:
+        # Step 1: Get Python code for the prompt, reusing the code generated earlier for the same prompt.
+        program_key = code_cache.cache.program_key(CODE_MODEL, CODE_SYSTEM_PROMPT, prompt)
+        code_to_execute = await code_cache.cache.programs.get_or_compute(program_key, lambda: generate_code(prompt))
+        
+        # Step 2: Execute it. Output of side-effect-free programs is cached by code hash.
+        if code_cache.is_pure(code_to_execute):
+            output_key = code_cache.cache.output_key(code_to_execute)
+            result = await code_cache.cache.outputs.get_or_compute(output_key, lambda: run_code(code_to_execute))
+        else:
+            result = await run_code(code_to_execute)
+        return result or "[No output from code execution]"
+
+    except Exception as e:
+        return f"Code interpreter error: {e}"
+    
+@router.route('code', keywords=['calculate', 'compute', 'what is the result', 'program for', 'sum of squares'], priority=40, model=CODE_MODEL)
+async def route_code(match, **context):
+    return await code_interpreter(match.text)
@@ -0,0 +1,44 @@
+"""Storing facts ("remember that ...") and answering from them ("do you remember ...")."""
+import asyncio
+import metrics
+from llm import client
+from router import router
+
+DEPENDENCIES = ()
+
+async def recall_memories(query: str, original_prompt: str, memory, stream: bool = False):
+    """
+    Searches the memory database for facts relevant to a query, then uses an LLM
+    to formulate a specific answer based on the user's original question.
+    """
+    # Only the top-k facts (exact keyword matches first, then the closest by meaning) reach the prompt
+    found_facts = await memory.recall(original_prompt, keyword=query)
+    if not found_facts:
+        return "I couldn't find any information about that in my memory."
+    return await answer_from_memories(found_facts, original_prompt, stream)
+
+async def answer_from_memories(found_facts: list, original_prompt: str, stream: bool = False):
+    facts_str = "; ".join(found_facts)
+    prompt = f"Based on the following stored fact(s): '{facts_str}', provide a direct answer to the user's original question: '{original_prompt}'"
+    messages = [{'role': 'user', 'content': prompt}]
+    if stream:
+        return client.stream_chat(model='llama3', messages=messages)
+    
+    response = await client.chat(
+        model='llama3',
+        messages=messages
+    )
+    return response['message']['content']
+
+@router.route('recall', keywords=['do you remember', 'what did i tell you', 'check your memory', 'what was paired with'], priority=60, model='llama3')
+async def route_recall(match, memory, stream=False, **context):
+    query = match.numbers[0] if match.numbers else None
+    return await recall_memories(query, match.text, memory, stream)
+
+@router.route('store', keywords=['remember that', 'remember this', 'store this', 'for future reference'], priority=50, model='llama3')
+async def route_store(match, memory, fact_extractor, **context):
+    # Persist the raw utterance now; the clean fact is extracted in the background.
+    async with metrics.stage('memory_store'):
+        fact_key = await asyncio.to_thread(memory.store.add, match.text, False)
+    fact_extractor.submit(fact_key, match.text)
+    return "OK, I've remembered that."
@@ -0,0 +1,73 @@
+import os
+import re
+import ast
+import sys
+import hashlib
+import sandbox
+from response_cache import ResponseCache, DiskTier, make_key
+
+CODE_CACHE_PATH = os.getenv("CODE_CACHE_PATH", "code_cache.sqlite3")
+CODE_CACHE_SIZE = int(os.getenv("CODE_CACHE_SIZE", "2048"))
+CODE_CACHE_TTL = float(os.getenv("CODE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Imports a program may use and still count as free of side effects (deterministic, no I/O).
+PURE_MODULES = {
+    'math', 'cmath', 'itertools', 'functools', 'collections', 'fractions', 'decimal', 'statistics',
+    'string', 're', 'operator', 'heapq', 'bisect', 'hashlib', 'json', 'typing', 'numbers', 'textwrap',
+}
+# Builtins that do I/O, reach around the import and attribute checks, or differ between runs (id).
+IMPURE_NAMES = {'open', 'input', 'exec', 'eval', 'compile', 'globals', 'locals', 'vars', 'breakpoint', 'help', 'memoryview',
+                'getattr', 'setattr', 'delattr', 'id'}
+
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+
+def is_pure(code: str) -> bool:
+    """True if the program only uses whitelisted imports and no I/O or introspection builtins, so its stdout can be reused."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split('.')[0] not in PURE_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if not node.module or node.module.split('.')[0] not in PURE_MODULES:
+                return False
+        elif isinstance(node, ast.Name) and (node.id in IMPURE_NAMES or node.id.startswith('__')):
+            # Dunder names (__builtins__, __import__, __loader__, ...) reach the blocked builtins another way.
+            return False
+        elif isinstance(node, ast.Attribute) and node.attr.startswith('__'):
+            return False
+    return True
+
+
+class CodeCache:
+    """
+    Two cache levels for code_interpreter. `programs` maps (model, system prompt, normalized user
+    prompt) to the cleaned generated code, so changing the model or system prompt naturally misses.
+    `outputs` maps a hash of the code to its stdout and is only used for side-effect-free programs.
+    Both levels are LRU/TTL-evicted in memory and persisted to an SQLite disk tier.
+    """
+
+    def __init__(self, path: str = CODE_CACHE_PATH, size: int = CODE_CACHE_SIZE, ttl: float = CODE_CACHE_TTL):
+        disk = DiskTier(path) if path else None
+        self.programs = ResponseCache("program", size, ttl, disk)
+        self.outputs = ResponseCache("output", size, ttl, disk)
+
+    def program_key(self, model: str, system_prompt: str, prompt: str) -> str:
+        return make_key(model, system_prompt, normalize_prompt(prompt))
+
+    def output_key(self, code: str) -> str:
+        # The hash seed is part of the runtime: outputs cached before workers used a fixed one are not reused.
+        runtime = f"{sys.version_info[0]}.{sys.version_info[1]}:hashseed={sandbox.WORKER_ENV['PYTHONHASHSEED']}"
+        return hashlib.sha256(f"{runtime}\0{code}".encode('utf-8')).hexdigest()
+
+    def stats(self) -> dict:
+        return {"programs": self.programs.stats(), "outputs": self.outputs.stats()}
+
+
+cache = CodeCache()
@@ -0,0 +1,230 @@
+import os
+import re
+import zlib
+import itertools
+import numpy as np
+from llm import client
+
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+# Above this many vectors, searches probe the closest clusters (IVF) instead of scanning everything.
+VECTOR_ANN_THRESHOLD = int(os.getenv("VECTOR_ANN_THRESHOLD", "50000"))
+VECTOR_ANN_PROBES = int(os.getenv("VECTOR_ANN_PROBES", "8"))
+
+
+# --- Embedders ---
+# An embedder is any object with a `name` and an async `embed(texts) -> np.ndarray` of shape (len(texts), dim).
+
+class OllamaEmbedder:
+    """Embeds text through the Ollama embeddings endpoint."""
+
+    def __init__(self, model: str = OLLAMA_EMBED_MODEL):
+        self.model = model
+        self.name = f"ollama:{model}"
+
+    async def embed(self, texts: list) -> np.ndarray:
+        response = await client.embed(model=self.model, input=list(texts))
+        return np.asarray(response['embeddings'], dtype=np.float32)
+
+
+class HashingEmbedder:
+    """A dependency-free local embedder (hashed bag of words and character trigrams), useful offline and in tests."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def _features(self, text: str) -> list:
+        words = re.findall(r'\w+', text.lower())
+        grams = [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+        return words + grams
+
+    async def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                vectors[row, zlib.crc32(feature.encode('utf-8')) % self.dim] += 1.0
+        return vectors
+
+
+def default_embedder():
+    if os.getenv("MEMORY_EMBEDDER", "ollama") == "hashing":
+        return HashingEmbedder()
+    return OllamaEmbedder()
+
+
+# --- Vector Index ---
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_ivf(data: np.ndarray, iterations: int = 10) -> tuple:
+    """
+    Partitions unit-normalized rows with k-means into about sqrt(n) clusters. Returns the
+    centroids and, per cluster, the list of its row numbers. Pure computation, so it can run in
+    a worker thread; install the result with VectorIndex.install_partition().
+    """
+    size = len(data)
+    n_lists = max(1, int(np.sqrt(size)))
+    rng = np.random.default_rng(0)
+    sample = data[rng.choice(size, size=min(size, n_lists * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = sample[labels == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    labels = np.empty(size, dtype=np.int32)
+    for start in range(0, size, 8192):
+        block = data[start:start + 8192]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    order = np.argsort(labels, kind='stable')
+    bounds = np.cumsum(np.bincount(labels, minlength=n_lists))[:-1]
+    return centroids, [rows.tolist() for rows in np.split(order, bounds)]
+
+
+class VectorIndex:
+    """
+    Unit-normalized vectors in one contiguous float32 matrix, searched with batched cosine
+    similarity. Once the index grows past `ann_threshold` rows, needs_partition() asks for an
+    inverted-file (IVF) partition: the owner builds it off the event loop with build_ivf() and
+    installs it, and from then on searches only score the rows in the closest `probes` clusters.
+    Until a partition is installed, searches score every row.
+    """
+
+    def __init__(self, ann_threshold: int = VECTOR_ANN_THRESHOLD, probes: int = VECTOR_ANN_PROBES):
+        self.ann_threshold = ann_threshold
+        self.probes = probes
+        self.dim = None
+        self._matrix = None
+        self._ids = None
+        self._size = 0
+        self._row_of = {}
+        self._centroids = None
+        self._assignments = None
+        self._lists = None
+        self._built_at = 0
+        self._changed = None
+
+    def __len__(self):
+        return self._size
+
+    def add(self, ids: list, vectors: np.ndarray):
+        vectors = _normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._matrix = np.zeros((64, self.dim), dtype=np.float32)
+            self._ids = np.zeros(64, dtype=np.int64)
+        for item_id, vector in zip(ids, vectors):
+            row = self._row_of.get(item_id)
+            if row is None:
+                if self._size == len(self._ids):
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._row_of[item_id] = row
+                self._ids[row] = item_id
+                self._matrix[row] = vector
+                if self._centroids is not None:
+                    self._assign(row)
+                continue
+            self._matrix[row] = vector
+            if self._changed is not None:
+                self._changed.add(row)
+            if self._centroids is not None:
+                self._reassign(row)
+
+    def needs_partition(self) -> bool:
+        """Whether the index is large enough for a (new) IVF partition: first at ann_threshold rows, then each time it doubles."""
+        return self._size >= self.ann_threshold and self._size >= 2 * self._built_at
+
+    def partition_rows(self) -> np.ndarray:
+        """
+        The rows to pass to build_ivf(). Vectors replaced while the partition is built are
+        reassigned when it is installed.
+        """
+        self._changed = set()
+        return self._matrix[:self._size]
+
+    def install_partition(self, centroids: np.ndarray, lists: list):
+        """Swaps in a partition from build_ivf() and assigns the rows added or replaced since partition_rows()."""
+        built = sum(len(rows) for rows in lists)
+        self._centroids = centroids
+        self._lists = lists
+        self._assignments = np.zeros(len(self._ids), dtype=np.int32)
+        self._assignments[np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64, count=built)] = np.repeat(
+            np.arange(len(lists), dtype=np.int32), [len(rows) for rows in lists]
+        )
+        changed, self._changed = self._changed or set(), None
+        for row in changed:
+            if row < built:
+                self._reassign(row)
+        for start in range(built, self._size, 8192):
+            block = self._matrix[start:min(start + 8192, self._size)]
+            for row, cluster in enumerate(np.argmax(block @ centroids.T, axis=1).tolist(), start):
+                self._assignments[row] = cluster
+                lists[cluster].append(row)
+        self._built_at = built
+
+    def search(self, queries: np.ndarray, k: int) -> list:
+        """Returns, for each query vector, up to k (id, score) pairs sorted by descending cosine similarity."""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if self._size == 0:
+            return [[] for _ in queries]
+        if self._centroids is not None:
+            results = []
+            for query in queries:
+                rows = self._candidates(query)
+                results.append(self._top_k(self._matrix[rows] @ query, rows, k))
+            return results
+        scores = queries @ self._matrix[:self._size].T
+        rows = np.arange(self._size)
+        return [self._top_k(row_scores, rows, k) for row_scores in scores]
+
+    def score(self, ids: list, query: np.ndarray) -> dict:
+        """Returns the cosine similarity between the query and each indexed id."""
+        rows = [self._row_of[i] for i in ids if i in self._row_of]
+        if not rows:
+            return {}
+        scores = self._matrix[rows] @ _normalize(np.asarray(query, dtype=np.float32).ravel())
+        return {int(self._ids[row]): float(score) for row, score in zip(rows, scores)}
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, k: int) -> list:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return [(int(self._ids[rows[i]]), float(scores[i])) for i in best]
+
+    def _grow(self):
+        capacity = 2 * len(self._ids)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+        if self._assignments is not None:
+            assignments = np.zeros(capacity, dtype=np.int32)
+            assignments[:self._size] = self._assignments[:self._size]
+            self._assignments = assignments
+
+    def _assign(self, row: int):
+        cluster = int(np.argmax(self._centroids @ self._matrix[row]))
+        self._assignments[row] = cluster
+        self._lists[cluster].append(row)
+
+    def _reassign(self, row: int):
+        cluster = int(np.argmax(self._centroids @ self._matrix[row]))
+        if cluster != self._assignments[row]:
+            self._lists[self._assignments[row]].remove(row)
+            self._assignments[row] = cluster
+            self._lists[cluster].append(row)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        probes = min(self.probes, len(self._centroids))
+        nearest = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+        return np.fromiter(itertools.chain.from_iterable(self._lists[c] for c in nearest), dtype=np.int64)
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import asyncio
+import metrics
+import llm
+from llm import client
+
+FACT_BATCH_SIZE = int(os.getenv("FACT_BATCH_SIZE", "8"))
+# How long the worker waits for more utterances to join a batch after the first one arrives.
+FACT_BATCH_WAIT = float(os.getenv("FACT_BATCH_WAIT", "0.05"))
+# Utterances claimed by a worker longer ago than this without being extracted are taken over by
+# another worker (the first one stopped or crashed); the store is rescanned at the same interval.
+FACT_CLAIM_TTL = float(os.getenv("FACT_CLAIM_TTL", "300"))
+
+
+def single_extraction_prompt(utterance: str) -> str:
+    return f"From the user's request, extract only the core fact or piece of information they want me to remember. For example, from 'Please remember this for later: the secret code is 1234', you would extract 'the secret code is 1234'. From the request '{utterance}', extract the core fact."
+
+
+def batch_extraction_prompt(utterances: list) -> str:
+    numbered = "\n".join(f"{i + 1}. {utterance}" for i, utterance in enumerate(utterances))
+    return (
+        "For each numbered user request below, extract only the core fact or piece of information they want me to remember. "
+        "For example, from 'Please remember this for later: the secret code is 1234', you would extract 'the secret code is 1234'. "
+        f'Respond with a JSON object {{"facts": [...]}} holding exactly {len(utterances)} strings, one per request, in the same order.\n\n{numbered}'
+    )
+
+
+def clean_fact(text: str) -> str:
+    return text.strip().replace('"', '')
+
+
+class FactExtractor:
+    """
+    Background worker that turns stored raw utterances into clean facts. Utterances are queued
+    as they are stored, grouped into batches (several per model call), and each cleaned fact
+    replaces its raw text in the store atomically before being embedded for semantic recall.
+    """
+
+    def __init__(self, memory, batch_size: int = FACT_BATCH_SIZE, batch_wait: float = FACT_BATCH_WAIT, claim_ttl: float = FACT_CLAIM_TTL):
+        self.memory = memory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.claim_ttl = claim_ttl
+        self._queue = None
+        self._worker = None
+        self._queued = set()
+
+    def submit(self, key: str, utterance: str):
+        """Queues an utterance for extraction. Must be called on the event loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker = llm.background(self._run())
+        self._queued.add(key)
+        self._queue.put_nowait((key, utterance))
+
+    async def resume(self):
+        """
+        Requeues utterances whose extraction did not finish: left over from the last shutdown, or
+        claimed by a worker process that has stopped. Rescans every claim_ttl seconds, and then also
+        embeds extracted facts whose embedding failed.
+        """
+        while True:
+            try:
+                for key, utterance in await asyncio.to_thread(self.memory.store.claim_extractions, self.claim_ttl):
+                    if key not in self._queued:
+                        self.submit(key, utterance)
+            except Exception as e:
+                print(f"Fact extraction resume error: {e}", file=sys.stderr)
+            await asyncio.sleep(self.claim_ttl)
+            await self.memory.backfill()
+
+    async def _run(self):
+        # The worker outlives the request that started it; its batches are timed on their own.
+        metrics.detach()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), max(timeout, 0)))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                async with metrics.stage('fact_extraction'):
+                    await self._process(batch)
+            except Exception as e:
+                # The raw utterances stay searchable and are retried by resume() once their claim expires.
+                print(f"Fact extraction error: {e}", file=sys.stderr)
+            finally:
+                self._queued.difference_update(key for key, _ in batch)
+
+    async def _process(self, batch: list):
+        facts = await self._extract([utterance for _, utterance in batch])
+        # An utterance the model extracts nothing from is kept as it was rather than retried forever.
+        cleaned = [(key, fact or utterance) for (key, utterance), fact in zip(batch, facts)]
+        await asyncio.to_thread(self.memory.store.set_extracted, cleaned)
+        try:
+            await self.memory.embed_facts(cleaned)
+        except Exception as e:
+            # The facts are extracted either way; resume() embeds them on its next pass.
+            print(f"Embedding error for extracted facts: {e}", file=sys.stderr)
+
+    async def _extract(self, utterances: list) -> list:
+        if len(utterances) > 1:
+            response = await client.chat(
+                model='llama3', messages=[{'role': 'user', 'content': batch_extraction_prompt(utterances)}], format='json', options={'temperature': 0.0}, cache=True
+            )
+            try:
+                facts = json.loads(response['message']['content'])['facts']
+                if isinstance(facts, list) and len(facts) == len(utterances):
+                    return [clean_fact(str(fact)) for fact in facts]
+            except (ValueError, KeyError, TypeError):
+                pass
+            # The model did not follow the batch format; fall back to one call per utterance.
+            results = await asyncio.gather(*(self._extract([utterance]) for utterance in utterances))
+            return [facts[0] for facts in results]
+        response = await client.chat(model='llama3', messages=[{'role': 'user', 'content': single_extraction_prompt(utterances[0])}], options={'temperature': 0.0}, cache=True)
+        return [clean_fact(response['message']['content'])]
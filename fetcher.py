@@ -0,0 +1,275 @@
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import Counter
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, Comment
+import metrics
+
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", ".page_cache")
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+FETCH_POOL_SIZE = int(os.getenv("FETCH_POOL_SIZE", "16"))
+# Page cache bounds: entries not rewritten for this many seconds are deleted, then the oldest
+# beyond the entry limit. Checked at startup and every PRUNE_EVERY writes.
+FETCH_CACHE_MAX_AGE = float(os.getenv("FETCH_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+FETCH_CACHE_MAX_ENTRIES = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "1000"))
+# Characters of extracted page content sent to the model.
+PAGE_CONTEXT_CHARS = int(os.getenv("PAGE_CONTEXT_CHARS", "8000"))
+CHUNK_CHARS = 400
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+STRIPPED_TAGS = ['script', 'style', 'noscript', 'svg', 'template', 'iframe', 'canvas']
+TEXT_ATTRIBUTES = ['alt', 'title', 'aria-label', 'placeholder', 'value']
+STOPWORDS = {'a', 'an', 'and', 'are', 'browse', 'find', 'for', 'from', 'how', 'in', 'is', 'it', 'me', 'of', 'on', 'or', 'page', 'please', 'tell', 'the', 'this', 'to', 'what', 'which', 'who', 'with'}
+
+
+class Page:
+    def __init__(self, url: str, text: str, headers: dict, from_cache: bool = False):
+        self.url = url
+        self.text = text
+        self.headers = headers
+        self.from_cache = from_cache
+
+
+# --- HTTP Cache ---
+
+def _cache_control(headers: dict) -> dict:
+    directives = {}
+    for part in headers.get('cache-control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def _freshness_lifetime(headers: dict) -> float:
+    directives = _cache_control(headers)
+    if 'no-cache' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            return float(directives['max-age'])
+        except ValueError:
+            return 0
+    if 'expires' in headers and 'date' in headers:
+        try:
+            return (parsedate_to_datetime(headers['expires']) - parsedate_to_datetime(headers['date'])).total_seconds()
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class PageCache:
+    """
+    An on-disk HTTP cache: one JSON file per URL with the body, validators and caching headers.
+    Bounded by entry age and count.
+    """
+
+    KEPT_HEADERS = ('etag', 'last-modified', 'cache-control', 'expires', 'date', 'content-type')
+    PRUNE_EVERY = 100
+
+    def __init__(self, directory: str = FETCH_CACHE_DIR, max_age: float = FETCH_CACHE_MAX_AGE, max_entries: int = FETCH_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._puts = 0
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url: str):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, text: str, headers: dict):
+        entry = {"url": url, "stored_at": time.time(), "text": text, "headers": {k: v for k, v in headers.items() if k in self.KEPT_HEADERS}}
+        path = self._path(url)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp, path)
+        self._puts += 1
+        if self._puts % self.PRUNE_EVERY == 0:
+            self.prune()
+        return entry
+
+    def delete(self, url: str):
+        try:
+            os.remove(self._path(url))
+        except OSError:
+            pass
+
+    def prune(self):
+        """Deletes entries (and abandoned temp files) older than max_age, then the oldest beyond max_entries."""
+        now, entries = time.time(), []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                try:
+                    modified = item.stat().st_mtime
+                    if now - modified > self.max_age:
+                        os.remove(item.path)
+                    elif item.name.endswith('.json'):
+                        entries.append((modified, item.path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def is_cacheable(headers: dict) -> bool:
+        """Whether a response can ever be reused: it is fresh for a while or can be revalidated."""
+        if 'no-store' in _cache_control(headers):
+            return False
+        return 'etag' in headers or 'last-modified' in headers or _freshness_lifetime(headers) > 0
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        return time.time() - entry["stored_at"] < _freshness_lifetime(entry["headers"])
+
+
+class Fetcher:
+    """
+    Fetches pages over one pooled requests.Session and answers from the page cache while entries
+    are fresh (Cache-Control max-age / Expires), revalidating stale ones with If-None-Match /
+    If-Modified-Since so an unchanged page costs a 304 instead of a full download.
+    """
+
+    def __init__(self, cache: PageCache = None, timeout: float = FETCH_TIMEOUT, pool_size: int = FETCH_POOL_SIZE):
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url: str) -> Page:
+        entry = self.cache.get(url) if self.cache else None
+        if entry and PageCache.is_fresh(entry):
+            return Page(url, entry["text"], entry["headers"], from_cache=True)
+
+        conditional = {}
+        if entry:
+            if 'etag' in entry["headers"]:
+                conditional['If-None-Match'] = entry["headers"]['etag']
+            if 'last-modified' in entry["headers"]:
+                conditional['If-Modified-Since'] = entry["headers"]['last-modified']
+        with metrics.stage('fetch'):
+            response = self.session.get(url, headers=conditional, timeout=self.timeout)
+        headers = {k.lower(): v for k, v in response.headers.items()}
+
+        if response.status_code == 304 and entry:
+            entry = self.cache.put(url, entry["text"], dict(entry["headers"], **headers))
+            return Page(url, entry["text"], entry["headers"], from_cache=True)
+        response.raise_for_status()
+        if self.cache and PageCache.is_cacheable(headers):
+            self.cache.put(url, response.text, headers)
+        elif entry:
+            self.cache.delete(url)
+        return Page(url, response.text, headers)
+
+
+# --- Content Extraction ---
+
+def extract_chunks(html: str) -> list:
+    """
+    Turns HTML into a list of text chunks in document order: the title, visible text, link
+    targets, text-bearing attributes (alt, title, aria-label, ...) and HTML comments. Scripts,
+    styles and other non-content markup are dropped.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    lines = []
+    if soup.title and soup.title.string:
+        lines.append(f"Title: {soup.title.string.strip()}")
+    for meta in soup.find_all('meta', attrs={'name': re.compile(r'^(description|keywords)$', re.I)}):
+        if meta.get('content'):
+            lines.append(f"{meta['name']}: {meta['content']}")
+    for tag in soup(STRIPPED_TAGS):
+        tag.decompose()
+    for comment in soup.find_all(string=lambda s: isinstance(s, Comment)):
+        if comment.strip():
+            lines.append(f"(comment) {comment.strip()}")
+        comment.extract()
+    for element in soup.find_all(True):
+        for attr in TEXT_ATTRIBUTES:
+            value = element.get(attr)
+            if isinstance(value, str) and value.strip():
+                lines.append(f"({element.name} {attr}) {value.strip()}")
+        if element.name == 'a' and element.get('href') and not element['href'].startswith(('#', 'javascript:')):
+            lines.append(f"(link) {element.get_text(' ', strip=True)} -> {element['href']}")
+
+    body = soup.body or soup
+    lines.extend(line.strip() for line in body.get_text('\n').splitlines() if line.strip())
+
+    chunks, current = [], []
+    size = 0
+    for line in lines:
+        if size + len(line) > CHUNK_CHARS and current:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line[:PAGE_CONTEXT_CHARS])
+        size += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def _tokens(text: str) -> list:
+    return [t for t in re.findall(r'\w+', text.lower()) if t not in STOPWORDS]
+
+
+def select_content(chunks: list, query: str, budget: int = PAGE_CONTEXT_CHARS) -> str:
+    """
+    Ranks chunks against the query with BM25 and keeps the best ones that fit in `budget`
+    characters, returned in document order. With no usable query terms the page is kept
+    from the top.
+    """
+    terms = set(_tokens(query))
+    order = list(range(len(chunks)))
+    if terms:
+        chunk_tokens = [Counter(_tokens(chunk)) for chunk in chunks]
+        avg_len = sum(sum(c.values()) for c in chunk_tokens) / max(len(chunks), 1) or 1
+        doc_freq = {t: sum(1 for c in chunk_tokens if t in c) for t in terms}
+        scores = []
+        for counts in chunk_tokens:
+            length = sum(counts.values())
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term, 0)
+                if tf:
+                    idf = math.log(1 + (len(chunks) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                    score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / avg_len))
+            scores.append(score)
+        # Best-scoring chunks first; ties (including chunks without any term) keep document order.
+        order.sort(key=lambda i: -scores[i])
+
+    selected, used = [], 0
+    for i in order:
+        if used + len(chunks[i]) + 2 > budget:
+            continue
+        selected.append(i)
+        used += len(chunks[i]) + 2
+    return '\n\n'.join(chunks[i] for i in sorted(selected))
+
+
+fetcher = Fetcher(PageCache() if FETCH_CACHE_DIR else None)
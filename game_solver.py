@@ -0,0 +1,193 @@
+from array import array
+
+EMPTY, X, O = 0, 1, 2
+SYMBOLS = {'X': X, 'O': O}
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def opponent(player: int) -> int:
+    return O if player == X else X
+
+
+class Game:
+    """An N x N board where k marks in a row (horizontally, vertically or diagonally) win."""
+
+    def __init__(self, n: int = 3, k: int = None):
+        self.n = n
+        self.k = k or n
+        self.cells = n * n
+        self.pow3 = [3 ** i for i in range(self.cells)]
+        self.lines = self._lines()
+        self.lines_through = [[line for line in self.lines if cell in line] for cell in range(self.cells)]
+        # Win scores shrink with distance, so faster wins and slower losses are preferred.
+        self.win_score = self.cells + 2
+
+    def _lines(self) -> list:
+        n, k = self.n, self.k
+        lines = []
+        for row in range(n):
+            for col in range(n):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                    if 0 <= end_row < n and 0 <= end_col < n:
+                        lines.append(tuple((row + d_row * i) * n + col + d_col * i for i in range(k)))
+        return lines
+
+    def from_symbols(self, board: list) -> list:
+        """Converts a list like ['X', '_', 'O', ...] to cell values."""
+        return [SYMBOLS.get(str(cell).upper(), EMPTY) for cell in board]
+
+    def encode(self, cells: list) -> int:
+        """Encodes a board as a base-3 integer (cell i contributes value * 3**i)."""
+        return sum(value * self.pow3[i] for i, value in enumerate(cells) if value)
+
+    def wins_with(self, cells: list, move: int) -> bool:
+        player = cells[move]
+        return any(all(cells[i] == player for i in line) for line in self.lines_through[move])
+
+    def winner(self, cells: list) -> int:
+        for line in self.lines:
+            first = cells[line[0]]
+            if first and all(cells[i] == first for i in line):
+                return first
+        return EMPTY
+
+    def heuristic(self, cells: list, player: int) -> float:
+        """A value in (-1, 1): lines still open for the player minus lines open for the opponent, weighted by marks."""
+        other = opponent(player)
+        total = 0
+        for line in self.lines:
+            mine = sum(1 for i in line if cells[i] == player)
+            theirs = sum(1 for i in line if cells[i] == other)
+            if mine and not theirs:
+                total += mine * mine
+            elif theirs and not mine:
+                total -= theirs * theirs
+        return total / (len(self.lines) * self.k * self.k + 1)
+
+
+class Solver:
+    """
+    Negamax search with alpha-beta pruning, an optional depth limit (falling back to a heuristic
+    at the horizon) and a transposition table keyed on the base-3 board code and side to move.
+    """
+
+    def __init__(self, game: Game, max_depth: int = None):
+        self.game = game
+        self.max_depth = max_depth if max_depth is not None else game.cells
+        self.table = {}
+
+    def best_move(self, board: list, player: str = 'X') -> int:
+        """Returns the index of the best move for `player`, or -1 if the game is already over."""
+        cells = self.game.from_symbols(board)
+        side = SYMBOLS[player.upper()]
+        if self.game.winner(cells) or EMPTY not in cells:
+            return -1
+        _, move = self._search(cells, self.game.encode(cells), side, self.max_depth, -float('inf'), float('inf'))
+        return move
+
+    def _search(self, cells: list, code: int, player: int, depth: int, alpha: float, beta: float):
+        key = code * 3 + player
+        entry = self.table.get(key)
+        tt_move = -1
+        if entry is not None:
+            entry_depth, value, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                    return value, tt_move
+
+        moves = [i for i, value in enumerate(cells) if value == EMPTY]
+        if not moves:
+            return 0, -1
+        if depth == 0:
+            return self.game.heuristic(cells, player), -1
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        original_alpha = alpha
+        best_value, best_move = -float('inf'), -1
+        game = self.game
+        for move in moves:
+            cells[move] = player
+            if game.wins_with(cells, move):
+                value = game.win_score - 1
+            else:
+                child, _ = self._search(cells, code + player * game.pow3[move], opponent(player), depth - 1, -beta, -alpha)
+                # Shift the child's score one ply further from the win/loss it describes.
+                value = -(child - 1 if child >= 1 else child + 1 if child <= -1 else child)
+            cells[move] = EMPTY
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        flag = UPPER if best_value <= original_alpha else LOWER if best_value >= beta else EXACT
+        self.table[key] = (depth, best_value, flag, best_move)
+        return best_value, best_move
+
+
+# --- Precomputed 3x3 table ---
+
+TIC_TAC_TOE = Game(3)
+
+
+def _build_tic_tac_toe_table() -> array:
+    """
+    Solves every position reachable from the empty board (with either side starting) exactly and
+    records X's optimal move for each one, indexed by base-3 board code; -1 marks positions where
+    X is not to move or the game is over. Ties go to the lowest cell index.
+    """
+    game = TIC_TAC_TOE
+    table = array('b', [-1]) * (3 ** game.cells)
+    values = {}
+
+    def value(cells, code, player):
+        # Exact minimax value for the side to move, memoized per (board, side).
+        key = code * 3 + player
+        if key in values:
+            return values[key]
+        best, best_move = -float('inf'), -1
+        for move in range(game.cells):
+            if cells[move] != EMPTY:
+                continue
+            cells[move] = player
+            if game.wins_with(cells, move):
+                score = game.win_score - 1
+            elif EMPTY not in cells:
+                score = 0
+            else:
+                child = value(cells, code + player * game.pow3[move], opponent(player))
+                score = -(child - 1 if child > 0 else child + 1 if child < 0 else 0)
+            cells[move] = EMPTY
+            if score > best:
+                best, best_move = score, move
+        if player == X:
+            table[code] = best_move
+        values[key] = best
+        return best
+
+    for first in (X, O):
+        value([EMPTY] * game.cells, 0, first)
+    return table
+
+
+TIC_TAC_TOE_MOVES = _build_tic_tac_toe_table()
+_tic_tac_toe_solver = Solver(TIC_TAC_TOE)
+
+
+def tic_tac_toe_move(board: list) -> int:
+    """O(1) optimal move for X on a 3x3 board given as ['X', 'O', '_', ...]; -1 if there is none."""
+    code = 0
+    for i, cell in enumerate(board):
+        value = SYMBOLS.get(str(cell).upper(), EMPTY)
+        if value:
+            code += value * TIC_TAC_TOE.pow3[i]
+    move = TIC_TAC_TOE_MOVES[code]
+    if move == -1:
+        # Positions no legal game reaches (e.g. X already has an extra mark) are searched instead.
+        return _tic_tac_toe_solver.best_move(board)
+    return move
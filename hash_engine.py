@@ -0,0 +1,188 @@
+import os
+import asyncio
+import hashlib
+import base64
+import binascii
+import multiprocessing
+from itertools import cycle, islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+# Chains needing at least this many digests run in the process pool instead of on the event loop.
+HASH_POOL_THRESHOLD = int(os.getenv("HASH_POOL_THRESHOLD", "2000"))
+HASH_MAX_ROUNDS = int(os.getenv("HASH_MAX_ROUNDS", "1000000"))
+# Large inputs are hashed in pieces of this many bytes; hashlib releases the GIL on each of them.
+CHUNK_SIZE = 1 << 20
+
+ALGORITHMS = frozenset(hashlib.algorithms_guaranteed)
+# Spellings people use for the same algorithms.
+ALIASES = {
+    'sha-1': 'sha1', 'sha-224': 'sha224', 'sha-256': 'sha256', 'sha-384': 'sha384', 'sha-512': 'sha512',
+    'sha3-224': 'sha3_224', 'sha3-256': 'sha3_256', 'sha3-384': 'sha3_384', 'sha3-512': 'sha3_512',
+    'shake128': 'shake_128', 'shake-128': 'shake_128', 'shake256': 'shake_256', 'shake-256': 'shake_256',
+}
+ALGORITHM_NAMES = tuple(sorted(ALGORITHMS | set(ALIASES)))
+# Output length in bytes of the extendable-output functions when a step does not give one.
+SHAKE_LENGTHS = {'shake_128': 32, 'shake_256': 64}
+ENCODINGS = ('hex', 'raw')
+
+
+class HashError(ValueError):
+    pass
+
+
+class Step:
+    """
+    One hash in a chain. `encoding` is what is fed to the next step: 'hex' (the hex digest as
+    ASCII, which is what chaining hexdigest() strings does) or 'raw' (the digest bytes).
+    """
+
+    def __init__(self, algorithm: str, encoding: str = 'hex', length: int = None):
+        algorithm = ALIASES.get(algorithm.lower(), algorithm.lower())
+        if algorithm not in ALGORITHMS:
+            raise HashError(f"Unsupported algorithm '{algorithm}'")
+        if encoding not in ENCODINGS:
+            raise HashError(f"Unsupported encoding '{encoding}' (use hex or raw)")
+        if length is not None and algorithm not in SHAKE_LENGTHS:
+            raise HashError(f"'{algorithm}' has a fixed digest length")
+        self.algorithm = algorithm
+        self.encoding = encoding
+        self.length = length or SHAKE_LENGTHS.get(algorithm)
+
+    def __repr__(self):
+        return f"Step({self.algorithm!r}, {self.encoding!r}, {self.length!r})"
+
+
+def parse_step(spec: str) -> Step:
+    """Parses "sha256", "sha256:raw" or "shake_128:16:hex" (algorithm, then an encoding and/or a length in bytes)."""
+    algorithm, *modifiers = spec.strip().split(':')
+    encoding, length = 'hex', None
+    for modifier in modifiers:
+        if modifier.isdigit():
+            length = int(modifier)
+        else:
+            encoding = modifier.lower()
+    return Step(algorithm, encoding, length)
+
+
+def _finish(hasher, step: Step) -> bytes:
+    digest = hasher.digest(step.length) if step.length else hasher.digest()
+    return binascii.hexlify(digest) if step.encoding == 'hex' else digest
+
+
+def _run_steps(value: bytes, steps: list, count: int) -> bytes:
+    # Constructors are looked up once; hashlib.new() per digest costs more than the digest itself.
+    for constructor, step in islice(cycle([(getattr(hashlib, step.algorithm), step) for step in steps]), count):
+        value = _finish(constructor(value), step)
+    return value
+
+
+def _result(value: bytes, steps: list) -> str:
+    return value.decode('ascii') if steps[-1].encoding == 'hex' else value.hex()
+
+
+def _check(steps: list, rounds: int):
+    if not steps:
+        raise HashError("No hash algorithms given")
+    if not 1 <= rounds <= HASH_MAX_ROUNDS:
+        raise HashError(f"Rounds must be between 1 and {HASH_MAX_ROUNDS}")
+
+
+def hash_chain(data: bytes, steps: list, rounds: int = 1) -> str:
+    """Applies `steps` in order, `rounds` times, starting from `data`; returns the last digest as hex."""
+    _check(steps, rounds)
+    return _result(_run_steps(data, steps, len(steps) * rounds), steps)
+
+
+def hash_stream(chunks, steps: list, rounds: int = 1) -> str:
+    """Like hash_chain, but the input is an iterable of byte chunks that is never held in memory at once."""
+    _check(steps, rounds)
+    first = steps[0]
+    hasher = getattr(hashlib, first.algorithm)()
+    for chunk in chunks:
+        hasher.update(chunk)
+    value = _finish(hasher, first)
+    # The remaining steps continue the cycle from the second one.
+    rest = steps[1:] + steps[:1]
+    return _result(_run_steps(value, rest, len(steps) * rounds - 1), steps)
+
+
+def base64_chunks(text: str, size: int = CHUNK_SIZE):
+    """Decodes a base64 string piece by piece (whitespace is ignored, as in MIME line-wrapped payloads)."""
+    step = size // 3 * 4
+    pending = ''
+    for start in range(0, len(text), step):
+        piece = pending + ''.join(text[start:start + step].split())
+        usable = len(piece) - len(piece) % 4
+        pending = piece[usable:]
+        if usable:
+            try:
+                yield base64.b64decode(piece[:usable], validate=True)
+            except binascii.Error as e:
+                raise HashError(f"Invalid base64 payload: {e}")
+    if pending:
+        raise HashError("Invalid base64 payload: incomplete final group")
+
+
+def _noop():
+    return None
+
+
+class HashEngine:
+    """
+    Runs hash chains off the event loop. Short chains are computed inline. Long chains go to a
+    process pool, since each round hashes a few dozen bytes and holds the GIL. Large streamed
+    inputs go to a thread, where hashlib releases the GIL for every chunk.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, pool_threshold: int = HASH_POOL_THRESHOLD):
+        self.workers = workers
+        self.pool_threshold = pool_threshold
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # fork: workers must not re-import the server's __main__ module, which spawn and forkserver do.
+            # The server already runs other threads at this point, which is safe here: with fork, the
+            # executor forks all its workers at its first submit, from the event loop thread, before its
+            # own manager thread starts. A child only runs multiprocessing's worker loop and hashlib on
+            # objects it creates, so it never needs a lock (SQLite, HTTP pools, selenium, stdio) that
+            # another server thread might have held at the fork; the import lock is reset by CPython.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+        return self._executor
+
+    async def _run_in_pool(self, fn, *args):
+        executor = self._pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory) and the executor cannot recover from that; the
+            # next call forks a fresh pool.
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def start(self):
+        """Forks the pool's workers ahead of the first long chain."""
+        await self._run_in_pool(_noop)
+
+    async def chain(self, data: bytes, steps: list, rounds: int = 1) -> str:
+        _check(steps, rounds)
+        if len(steps) * rounds < self.pool_threshold:
+            return hash_chain(data, steps, rounds)
+        return await self._run_in_pool(hash_chain, data, steps, rounds)
+
+    async def stream(self, chunks, steps: list, rounds: int = 1) -> str:
+        return await asyncio.to_thread(hash_stream, chunks, steps, rounds)
+
+    def close(self):
+        if self._executor is not None:
+            # Waiting lets the pool hand every worker its stop sentinel; a worker forked just before
+            # exit otherwise blocks the interpreter's final join forever.
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+engine = HashEngine()
@@ -0,0 +1,250 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+import httpx
+import ollama
+import metrics
+from response_cache import ResponseCache, DiskTier, make_key
+
+# --- Configuration ---
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+# Size of the shared HTTP connection pool towards Ollama.
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+# Per-model cap on in-flight calls, e.g. "llama3=4,moondream=2".
+OLLAMA_MAX_INFLIGHT = os.getenv("OLLAMA_MAX_INFLIGHT", "llama3=4,moondream=2")
+OLLAMA_DEFAULT_MAX_INFLIGHT = int(os.getenv("OLLAMA_DEFAULT_MAX_INFLIGHT", "2"))
+# Callers allowed to wait for a slot on one model before new calls are rejected.
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "256"))
+# Response cache for deterministic/replayed prompts. LLM_CACHE_PATH enables the on-disk tier.
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+
+def parse_limits(spec: str) -> dict:
+    """Parses a "model=limit,model=limit" string into a dict."""
+    limits = {}
+    for item in spec.split(','):
+        if '=' not in item: continue
+        model, limit = item.split('=', 1)
+        limits[model.strip()] = max(1, int(limit))
+    return limits
+
+
+class Overloaded(Exception):
+    """Raised when a model's wait queue is full."""
+
+
+class ModelGate:
+    """Caps the in-flight calls for one model and bounds how many callers may queue for a slot."""
+
+    def __init__(self, limit: int, max_queue: int, name: str = ""):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                metrics.queue_rejections.inc(gate=self.name)
+                raise Overloaded(f"Too many queued requests ({self.waiting}), try again later.")
+            self.waiting += 1
+            started = time.perf_counter()
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+                metrics.queue_wait_seconds.observe(time.perf_counter() - started, gate=self.name)
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class AsyncLLM:
+    """An async Ollama client sharing one pooled HTTP connection set, with per-model concurrency gates."""
+
+    def __init__(self, host: str, max_inflight: dict, default_max_inflight: int, max_queue: int, cache: ResponseCache = None):
+        self.host = host
+        self.max_inflight = max_inflight
+        self.default_max_inflight = default_max_inflight
+        self.max_queue = max_queue
+        self.cache = cache
+        self._client = None
+        self._gates = {}
+
+    def _ollama(self) -> ollama.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_CONNECTIONS)
+            self._client = ollama.AsyncClient(host=self.host, timeout=OLLAMA_TIMEOUT, limits=limits)
+        return self._client
+
+    def gate(self, model: str) -> ModelGate:
+        name = model.split(':')[0]
+        if name not in self._gates:
+            limit = self.max_inflight.get(name, self.default_max_inflight)
+            self._gates[name] = ModelGate(limit, self.max_queue, name)
+        return self._gates[name]
+
+    async def chat(self, model: str, messages: list, cache: bool = False, **kwargs):
+        """
+        Sends a chat request. With cache=True the response is looked up by model + messages +
+        options, and concurrent identical requests share a single model call.
+        """
+        if cache and self.cache is not None and not kwargs.get('stream'):
+            key = make_key(model, messages, kwargs)
+            return await self.cache.get_or_compute(key, lambda: self._chat_as_dict(model, messages, **kwargs))
+        async with self.gate(model):
+            started = time.perf_counter()
+            response = await self._ollama().chat(model=model, messages=messages, **kwargs)
+        metrics.record_llm_call(model, 'chat', time.perf_counter() - started, response)
+        return response
+
+    async def stream_chat(self, model: str, messages: list, cache: bool = False, **kwargs):
+        """Yields the response content piece by piece as the model generates it (one piece on a cache hit)."""
+        key = make_key(model, messages, kwargs) if cache and self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached['message']['content']
+                return
+        content = []
+        async with self.gate(model):
+            started = time.perf_counter()
+            chunk = None
+            async for chunk in await self._ollama().chat(model=model, messages=messages, stream=True, **kwargs):
+                piece = chunk['message']['content']
+                if piece:
+                    content.append(piece)
+                    yield piece
+            # The final chunk carries the token counts.
+            metrics.record_llm_call(model, 'stream', time.perf_counter() - started, chunk)
+        if key is not None:
+            await self.cache.store(key, {"model": model, "message": {"role": "assistant", "content": ''.join(content)}})
+
+    async def _chat_as_dict(self, model: str, messages: list, **kwargs) -> dict:
+        async with self.gate(model):
+            started = time.perf_counter()
+            response = await self._ollama().chat(model=model, messages=messages, **kwargs)
+        metrics.record_llm_call(model, 'chat', time.perf_counter() - started, response)
+        return response.model_dump(exclude_none=True)
+
+    async def embed(self, model: str, input, **kwargs):
+        async with self.gate(model):
+            started = time.perf_counter()
+            response = await self._ollama().embed(model=model, input=input, **kwargs)
+        metrics.record_llm_call(model, 'embed', time.perf_counter() - started, response)
+        return response
+
+    def stats(self) -> dict:
+        return {name: {"limit": g.limit, "in_flight": g.in_flight, "waiting": g.waiting} for name, g in self._gates.items()}
+
+
+# --- Event Loop ---
+# All model calls run on one background event loop so that many concurrent requests
+# share the connection pool and model slots instead of each holding a blocking call.
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True).start()
+    return _loop
+
+
+_background = set()
+
+
+async def _tracked(coro):
+    task = asyncio.current_task()
+    _background.add(task)
+    try:
+        return await coro
+    finally:
+        _background.discard(task)
+
+
+def background(coro):
+    """Starts a long-running coroutine on the shared loop; it is cancelled when the process exits."""
+    return asyncio.run_coroutine_threadsafe(_tracked(coro), get_loop())
+
+
+def _stop_background():
+    async def stop():
+        tasks = list(_background)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if _background:
+        try:
+            run(stop(), timeout=5)
+        except Exception:
+            pass
+
+
+# Background tasks hand blocking work to the loop's default executor, which stops accepting work
+# in a threading exit hook; atexit handlers run after that, too late to stop the tasks cleanly.
+threading._register_atexit(_stop_background)
+
+
+def iterate(async_iterator):
+    """Consumes an async iterator on the shared loop and yields its items in the calling thread."""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterator:
+                items.put(item)
+            items.put(done)
+        except BaseException as e:
+            items.put(e)
+            raise
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Stops the generation if the consumer goes away early (e.g. the client disconnected).
+        future.cancel()
+
+
+def run(coro, timeout: float = None):
+    """Runs a coroutine on the shared loop and blocks the calling thread until it finishes."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+disk_cache = DiskTier(LLM_CACHE_PATH) if LLM_CACHE_PATH else None
+response_cache = ResponseCache("chat", LLM_CACHE_SIZE, LLM_CACHE_TTL, disk_cache) if LLM_CACHE_SIZE > 0 else None
+client = AsyncLLM(OLLAMA_HOST, parse_limits(OLLAMA_MAX_INFLIGHT), OLLAMA_DEFAULT_MAX_INFLIGHT, OLLAMA_MAX_QUEUE, response_cache)
+metrics.registry.add(metrics.GaugeFunction('agent_model_in_flight', 'Ollama calls currently running, by model.', ('model',),
+                                           lambda: [((name,), gate["in_flight"]) for name, gate in client.stats().items()]))
+metrics.registry.add(metrics.GaugeFunction('agent_model_waiting', 'Calls waiting for a model slot, by model.', ('model',),
+                                           lambda: [((name,), gate["waiting"]) for name, gate in client.stats().items()]))
@@ -0,0 +1,195 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "agent_memory.sqlite3")
+# Seconds a write waits for another process's write to finish before failing.
+MEMORY_BUSY_TIMEOUT = float(os.getenv("MEMORY_BUSY_TIMEOUT", "10"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fact TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    raw TEXT,
+    extracted INTEGER NOT NULL DEFAULT 1,
+    claimed_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(fact, content='facts', content_rowid='id', tokenize='unicode61');
+CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
+    INSERT INTO facts_fts(rowid, fact) VALUES (new.id, new.fact);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_ad AFTER DELETE ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, fact) VALUES ('delete', old.id, old.fact);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_au AFTER UPDATE OF fact ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, fact) VALUES ('delete', old.id, old.fact);
+    INSERT INTO facts_fts(rowid, fact) VALUES (new.id, new.fact);
+END;
+CREATE TABLE IF NOT EXISTS fact_vectors (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    fact_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    UNIQUE (fact_id, model)
+);
+"""
+
+
+def fact_key(fact_id: int) -> str:
+    return f"fact_{fact_id}"
+
+
+def fact_id(key: str) -> int:
+    return int(key.rsplit('_', 1)[1])
+
+
+class MemoryStore:
+    """
+    Persistent fact storage on SQLite in WAL mode. Every write updates an FTS5 inverted index
+    over the words and numbers in the fact, so a lookup costs time proportional to the number
+    of matching facts rather than the size of the store. Several processes can share one file:
+    ids come from AUTOINCREMENT, writes are serialized by SQLite, and a writer waits up to
+    MEMORY_BUSY_TIMEOUT seconds for another one to finish.
+    """
+
+    def __init__(self, path: str = MEMORY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=MEMORY_BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Workers starting together create and upgrade the schema one at a time.
+        self._conn.executescript("BEGIN IMMEDIATE;" + SCHEMA + "COMMIT;")
+        self._write(self._upgrade)
+
+    def _upgrade(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(facts)")}
+        if 'raw' not in columns:
+            self._conn.execute("ALTER TABLE facts ADD COLUMN raw TEXT")
+            self._conn.execute("ALTER TABLE facts ADD COLUMN extracted INTEGER NOT NULL DEFAULT 1")
+        if 'claimed_at' not in columns:
+            self._conn.execute("ALTER TABLE facts ADD COLUMN claimed_at REAL")
+
+    def add(self, fact: str, extracted: bool = True) -> str:
+        """
+        Stores a fact and returns its key. The id comes from AUTOINCREMENT, so no count is needed.
+        With extracted=False the text is a raw utterance that is searchable right away and later
+        replaced by set_extracted(); it starts claimed by the calling process's extractor.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO facts (fact, created_at, raw, extracted, claimed_at) VALUES (?, ?, ?, ?, ?)",
+                (fact, now, fact, int(extracted), None if extracted else now)
+            )
+        return fact_key(cursor.lastrowid)
+
+    def add_many(self, facts: list):
+        """Stores already extracted facts in one transaction."""
+        now = time.time()
+        self._write_many("INSERT INTO facts (fact, created_at, raw, extracted) VALUES (?, ?, ?, 1)", [(fact, now, fact) for fact in facts])
+
+    def set_extracted(self, facts: list):
+        """Replaces raw utterances with their cleaned (key, fact) in one transaction, index included."""
+        rows = [(fact, fact_id(key)) for key, fact in facts]
+        self._write_many("UPDATE facts SET fact = ?, extracted = 1 WHERE id = ?", rows)
+
+    def claim_extractions(self, lease: float, limit: int = 1000) -> list:
+        """
+        Claims raw utterances still waiting for fact extraction that nobody claimed in the last
+        `lease` seconds (their worker stopped or crashed), and returns them as (key, raw) pairs.
+        The claim is atomic, so concurrent workers never get the same utterance.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE facts SET claimed_at = ? WHERE id IN (SELECT id FROM facts WHERE extracted = 0 AND "
+                "(claimed_at IS NULL OR claimed_at < ?) ORDER BY id LIMIT ?) RETURNING id, raw", (now, now - lease, limit)
+            ).fetchall()
+        return [(fact_key(row[0]), row[1]) for row in sorted(rows)]
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT fact FROM facts WHERE id = ?", (fact_id(key),)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, ids: list) -> dict:
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, fact FROM facts WHERE id IN ({placeholders})", list(ids)).fetchall()
+        return dict(rows)
+
+    def match_ids(self, query: str, limit: int = None) -> list:
+        """Returns the ids of facts containing every word/number token of the query, oldest first."""
+        tokens = re.findall(r'\w+', query.lower())
+        if not tokens:
+            return []
+        match_expr = ' AND '.join('"' + token + '"' for token in tokens)
+        sql = "SELECT rowid FROM facts_fts WHERE facts_fts MATCH ? ORDER BY rowid"
+        params = [match_expr]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Returns the facts containing every word/number token of the query, oldest first."""
+        ids = self.match_ids(query, limit)
+        facts = self.get_many(ids)
+        return [facts[i] for i in ids if i in facts]
+
+    # --- Embeddings ---
+
+    def set_vectors(self, model: str, vectors: list):
+        """Stores (key, float32 bytes) pairs. Replacing a vector gives it a new seq so readers pick it up."""
+        rows = [(fact_id(key), model, blob) for key, blob in vectors]
+        self._write_many("INSERT OR REPLACE INTO fact_vectors (fact_id, model, vector) VALUES (?, ?, ?)", rows)
+
+    def vectors_since(self, model: str, seq: int, limit: int = -1) -> list:
+        """Returns (seq, fact_id, bytes) rows written after `seq`, so an in-memory index can sync incrementally."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, fact_id, vector FROM fact_vectors WHERE model = ? AND seq > ? ORDER BY seq LIMIT ?", (model, seq, limit)
+            ).fetchall()
+
+    def missing_vectors(self, model: str, limit: int) -> list:
+        """Returns (key, fact) pairs that have no vector for `model` yet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, fact FROM facts WHERE id NOT IN (SELECT fact_id FROM fact_vectors WHERE model = ?) ORDER BY id LIMIT ?", (model, limit)
+            ).fetchall()
+        return [(fact_key(row[0]), row[1]) for row in rows]
+
+    def _write_many(self, sql: str, rows: list):
+        self._write(lambda: self._conn.executemany(sql, rows))
+
+    def _write(self, work):
+        # IMMEDIATE takes the write lock up front, so the busy timeout applies instead of a
+        # read transaction failing when it tries to upgrade.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                work()
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def items(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, fact FROM facts ORDER BY id").fetchall()
+        return [(fact_key(row[0]), row[1]) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM facts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,251 @@
+import os
+import time
+import uuid
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Adds the trace id and per-stage timings to every message/send response; clients can also ask
+# for them per request with params.metadata.trace = true.
+METRICS_TRACE_RESPONSES = os.getenv("METRICS_TRACE_RESPONSES", "0") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list:
+        return [f"{self.name}{_labels(self.labels, key)} {_format(value)}"]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum, count.
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self, key: tuple, value) -> list:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else _format(bound)
+            labels = _labels(self.labels, key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_format(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class GaugeFunction(Metric):
+    """A gauge read when /metrics is scraped: `read()` returns [(label values, value), ...]."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: tuple, read):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.read():
+            lines.extend(self._samples(tuple(key), value))
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4)."""
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+registry = Registry()
+request_seconds = registry.add(Histogram('agent_request_seconds', 'Time to answer a request, by route and outcome.', ('route', 'status')))
+stage_seconds = registry.add(Histogram('agent_stage_seconds', 'Time spent in each stage of the request path.', ('stage',)))
+llm_call_seconds = registry.add(Histogram('agent_llm_call_seconds', 'Duration of Ollama calls.', ('model', 'kind')))
+llm_tokens = registry.add(Counter('agent_llm_tokens_total', 'Prompt and generated tokens reported by Ollama.', ('model', 'type')))
+cache_events = registry.add(Counter('agent_cache_events_total', 'Cache lookups by cache and outcome.', ('cache', 'outcome')))
+queue_wait_seconds = registry.add(Histogram('agent_queue_wait_seconds', 'Time spent waiting for a free slot, by gate.', ('gate',)))
+queue_rejections = registry.add(Counter('agent_queue_rejections_total', 'Calls rejected because a wait queue was full.', ('gate',)))
+
+
+# --- Tracing ---
+
+class Trace:
+    """The stages one request went through, collected while it runs."""
+
+    def __init__(self, trace_id: str = None):
+        self.id = trace_id or uuid.uuid4().hex
+        self.route = None
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> dict:
+        return {"traceId": self.id, "stages": [{"stage": name, "ms": round(seconds * 1000, 3)} for name, seconds in self.spans]}
+
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+@contextmanager
+def trace(trace_id: str = None):
+    """Makes a new Trace current for the code (and the tasks and threads it starts) inside the block."""
+    if not METRICS_ENABLED:
+        yield None
+        return
+    current = Trace(trace_id)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+def detach():
+    """Stops recording into the inherited trace, for long-lived tasks started while serving a request."""
+    _current.set(None)
+
+
+def annotate(route: str):
+    current = _current.get()
+    if current is not None:
+        current.route = route
+
+
+def record(name: str, seconds: float):
+    """Adds a finished span to the current trace."""
+    current = _current.get()
+    if current is not None:
+        current.spans.append((name, seconds))
+
+
+def observe_request(current: Trace, status: str):
+    if current is not None:
+        request_seconds.observe(current.elapsed(), route=current.route or 'none', status=status)
+
+
+class Stage:
+    """Times a block (sync or async) into agent_stage_seconds and the current trace."""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stage_seconds.observe(elapsed, stage=self.name)
+        record(self.name, elapsed)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        return self.__exit__(*exc_info)
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    return Stage(name) if METRICS_ENABLED else _NO_STAGE
+
+
+def record_llm_call(model: str, kind: str, seconds: float, response=None):
+    """Times an Ollama call and counts the prompt/eval tokens its (final) response reports."""
+    if not METRICS_ENABLED:
+        return
+    llm_call_seconds.observe(seconds, model=model, kind=kind)
+    record(f"llm:{model}", seconds)
+    if response is not None:
+        for field, token_type in (('prompt_eval_count', 'prompt'), ('eval_count', 'eval')):
+            count = response.get(field) if isinstance(response, dict) else getattr(response, field, None)
+            if count:
+                llm_tokens.inc(count, model=model, type=token_type)
@@ -0,0 +1,122 @@
+"""
+Imports the facts of the old `shelve` memory (agent_memory.db, keys fact_1, fact_2, ...) into the
+SQLite memory store. Facts already in the store are skipped, so running it again is harmless.
+
+    python migrate_shelve.py [agent_memory.db] [--db agent_memory.sqlite3]
+"""
+import os
+import sys
+import dbm
+import pickle
+import struct
+import argparse
+from memory_store import MemoryStore, MEMORY_DB_PATH
+
+MEMORY_SHELVE_PATH = os.getenv("MEMORY_SHELVE_PATH", "agent_memory.db")
+
+BDB_HASH_MAGIC = 0x061561
+# Offsets below this mark a pair stored on overflow pages instead of inline.
+BDB_REAL_KEY = 4
+
+
+def _open_dbm(path: str):
+    # shelve is opened without the extension that some dbm backends add to the file name.
+    for name in (os.path.splitext(path)[0], path):
+        try:
+            return dbm.open(name, 'r')
+        except Exception:
+            continue
+    return None
+
+
+def read_bdb_hash(data: bytes) -> list:
+    """
+    Reads the (key, value) pairs of a Berkeley DB 1.85 hash file, the format macOS's dbm.ndbm
+    writes and Linux Pythons cannot open. Pairs spilled onto overflow pages are not supported.
+    """
+    header = '>' if struct.unpack('>I', data[:4])[0] == BDB_HASH_MAGIC else '<'
+    if struct.unpack(header + 'I', data[:4])[0] != BDB_HASH_MAGIC:
+        raise ValueError("not a Berkeley DB hash file")
+    fields = struct.unpack(header + '16I', data[:64])
+    lorder, page_size, header_pages = fields[2], fields[3], fields[15]
+    order = '<' if lorder == 1234 else '>'
+    pairs = []
+    for start in range(header_pages * page_size, len(data) - page_size + 1, page_size):
+        page = data[start:start + page_size]
+        count = struct.unpack(order + 'H', page[:2])[0]
+        if count == 0 or count % 2 or count * 2 + 6 > page_size:
+            continue
+        offsets = struct.unpack(order + f'{count}H', page[2:2 + count * 2])
+        end, found = page_size, []
+        for key_offset, value_offset in zip(offsets[::2], offsets[1::2]):
+            if value_offset < BDB_REAL_KEY or not value_offset < key_offset <= end:
+                break
+            found.append((page[key_offset:end], page[value_offset:key_offset]))
+            end = value_offset
+        else:
+            pairs.extend(found)
+    return pairs
+
+
+def read_shelve(path: str) -> list:
+    """Returns the shelve's (key, value) pairs, through dbm when this Python can open the file."""
+    db = _open_dbm(path)
+    if db is not None:
+        with db:
+            raw = [(key, db[key]) for key in db.keys()]
+    else:
+        with open(path, 'rb') as f:
+            raw = read_bdb_hash(f.read())
+    items = []
+    for key, value in raw:
+        try:
+            items.append((key.decode('utf-8'), pickle.loads(value)))
+        except Exception as e:
+            print(f"Skipping unreadable shelve entry {key[:40]!r}: {e}")
+    return items
+
+
+def _order(key: str):
+    number = key.rsplit('_', 1)[-1]
+    return (0, int(number)) if number.isdigit() else (1, key)
+
+
+def migrate(path: str, store: MemoryStore) -> int:
+    """Adds the shelve's facts that the store does not hold yet, in fact number order. Returns how many."""
+    existing = {fact for _, fact in store.items()}
+    facts = []
+    for key, value in sorted(read_shelve(path), key=lambda item: _order(item[0])):
+        fact = str(value).strip()
+        if fact and fact not in existing:
+            existing.add(fact)
+            facts.append(fact)
+    store.add_many(facts)
+    return len(facts)
+
+
+def migrate_on_startup(store: MemoryStore):
+    """Imports the shelve at MEMORY_SHELVE_PATH, if there is one, when a server starts."""
+    if not os.path.exists(MEMORY_SHELVE_PATH):
+        return
+    try:
+        count = migrate(MEMORY_SHELVE_PATH, store)
+        if count:
+            print(f"Imported {count} facts from {MEMORY_SHELVE_PATH}")
+    except Exception as e:
+        print(f"Shelve migration error: {e}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('shelve', nargs='?', default=MEMORY_SHELVE_PATH)
+    parser.add_argument('--db', default=MEMORY_DB_PATH, help="SQLite memory store to import into")
+    args = parser.parse_args()
+    store = MemoryStore(args.db)
+    try:
+        print(f"Imported {migrate(args.shelve, store)} facts from {args.shelve} into {args.db}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import metrics
+
+
+def _encode(value):
+    # Image bytes inside messages are keyed by their digest rather than their content.
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(exclude_none=True)
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def make_key(*parts) -> str:
+    """Content-addressed key: the SHA-256 of the canonical JSON of the parts."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=_encode)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class DiskTier:
+    """A small SQLite table of JSON values with expiry times, shared by every cache namespace."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+        self.purge_expired()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self.delete(key)
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, json.dumps(value), expires_at))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+
+class ResponseCache:
+    """
+    An LRU + TTL cache of JSON-serializable values with an optional disk tier, and single-flight
+    coalescing: concurrent get_or_compute() calls for the same key share one computation.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl: float = 3600, disk: DiskTier = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def _count(self, stat: str, outcome: str):
+        self._stats[stat] += 1
+        metrics.cache_events.inc(cache=self.name, outcome=outcome)
+
+    def _disk_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value, expires_at: float = None):
+        if expires_at is None and self.ttl:
+            expires_at = time.time() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return expires_at
+
+    async def get_or_compute(self, key: str, compute):
+        """Returns the cached value for key, or awaits compute() once no matter how many callers ask."""
+        value = self.get(key)
+        if value is not None:
+            self._count("hits", "hit")
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            # The computation runs as its own task so that a cancelled caller does not abort it for the others.
+            task = asyncio.ensure_future(self._load_or_compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._count("coalesced", "coalesced")
+        return await asyncio.shield(task)
+
+    async def _load_or_compute(self, key: str, compute):
+        if self.disk is not None:
+            stored = await asyncio.to_thread(self.disk.get, self._disk_key(key))
+            if stored is not None:
+                self._count("disk_hits", "disk_hit")
+                value, expires_at = stored
+                self.put(key, value, expires_at)
+                return value
+        self._count("misses", "miss")
+        value = await compute()
+        expires_at = self.put(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, self._disk_key(key), value, expires_at)
+        return value
+
+    async def store(self, key: str, value):
+        """Adds a value computed outside get_or_compute() (e.g. assembled from a stream)."""
+        expires_at = self.put(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, self._disk_key(key), value, expires_at)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["disk_hits"] + self._stats["misses"] + self._stats["coalesced"]
+        hit_rate = (lookups - self._stats["misses"]) / lookups if lookups else 0.0
+        return dict(self._stats, size=len(self._entries), hit_rate=round(hit_rate, 4))
@@ -0,0 +1,165 @@
+import re
+from hash_engine import ALGORITHM_NAMES
+
+# Arguments pulled out of the prompt during the routing scan, in the order they are tried at a
+# position. All but numbers are lookaheads, so the scan continues inside them (a keyword inside a
+# URL or a quoted string still counts, as do the digits of "sha512").
+EXTRACTORS = {
+    'url': r'(?=(?P<url>https?://\S+))',
+    'quoted': r'(?=string "(?P<quoted>[^"]+)")',
+    # "1000 rounds" / "5 times": a repeat count (its digits are still collected as a number).
+    'rounds': r'(?=(?P<rounds>\d+)\s+(?:rounds|times|iterations)\b)',
+    'number': r'(?P<number>\d+)',
+}
+HASH_ALGORITHMS = ALGORITHM_NAMES
+
+
+def trie_pattern(words) -> str:
+    """
+    A regex matching any of `words`, with common prefixes merged (e.g. "what did|what was" becomes
+    "what\\ (?:did|was)") so each position costs one branch per distinct next character, however
+    many words there are. Longer words win over their own prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return ('(?:' + body + ')' if len(branches) == 1 and len(body) > 1 else body) + '?'
+        return body
+
+    return build(trie)
+
+
+class Route:
+    def __init__(self, name: str, handler, keywords=(), triggers=(), priority: int = 0, model: str = None, image: bool = False):
+        self.name = name
+        self.handler = handler
+        self.keywords = tuple(k.lower() for k in keywords)
+        # Extracted arguments that select the route on their own, e.g. ('url',) for browsing.
+        self.triggers = tuple(triggers)
+        self.priority = priority
+        # The model the route mostly uses, so batched requests can be grouped per model.
+        self.model = model
+        # Image routes win whenever the message carries an image.
+        self.image = image
+
+
+class RouteMatch:
+    def __init__(self, route: Route, text: str, keywords: set, urls: list, numbers: list, quoted: list, algorithms: list, rounds: list, image=None):
+        self.route = route
+        self.text = text
+        self.keywords = keywords
+        self.urls = urls
+        self.numbers = numbers
+        self.quoted = quoted
+        self.algorithms = algorithms
+        self.rounds = rounds
+        self.image = image
+
+
+class Router:
+    """
+    Picks a capability for a prompt with one regex scan. Every route keyword is merged into a
+    single prefix trie and combined with the argument extractors, so routing stays one pass over
+    the prompt as routes are added. The highest-priority route with a hit wins; the fallback route
+    (registered with fallback=True) handles everything else.
+    """
+
+    def __init__(self, algorithms=HASH_ALGORITHMS):
+        self.routes = []
+        self.fallback = None
+        self.algorithms = tuple(algorithms)
+        self._pattern = None
+        self._pattern_ignorecase = None
+        self._keyword_routes = {}
+        self._trigger_routes = {}
+        self._image_routes = []
+        self._rank = {}
+
+    def add(self, route: Route, fallback: bool = False) -> Route:
+        self.routes.append(route)
+        self.routes.sort(key=lambda r: -r.priority)
+        if fallback:
+            self.fallback = route
+        self._pattern = None
+        return route
+
+    def route(self, name: str, keywords=(), triggers=(), priority: int = 0, model: str = None, image: bool = False, fallback: bool = False):
+        """Decorator registering an async handler(match, **context) as a route."""
+        def register(handler):
+            self.add(Route(name, handler, keywords, triggers, priority, model, image), fallback)
+            return handler
+        return register
+
+    def compile(self):
+        self._rank = {route: rank for rank, route in enumerate(self.routes)}
+        direct = {}
+        for route in self.routes:
+            for keyword in route.keywords:
+                direct.setdefault(keyword, []).append(route)
+        # A hit on "remember that" also counts for a route listening for "remember".
+        self._keyword_routes = {
+            keyword: [route for i in range(1, len(keyword) + 1) for route in direct.get(keyword[:i], ())]
+            for keyword in direct
+        }
+        self._trigger_routes = {}
+        for route in self.routes:
+            for trigger in route.triggers:
+                self._trigger_routes.setdefault(trigger, []).append(route)
+        self._image_routes = [route for route in self.routes if route.image]
+        alternatives = list(EXTRACTORS.values())
+        if self.algorithms:
+            # An algorithm may carry ":raw" / ":hex" / ":<length>" modifiers, e.g. "sha256:raw".
+            alternatives.append(r'(?=\b(?P<algorithm>' + trie_pattern(self.algorithms) + r'(?::\w+)*)\b)')
+        if direct:
+            alternatives.append('(?=(?P<keyword>' + trie_pattern(direct) + '))')
+        # Matched against the lowercased prompt: plain literals let the regex engine reject a trie
+        # branch on its first character, which IGNORECASE would prevent.
+        self._pattern = re.compile('|'.join(alternatives))
+        self._pattern_ignorecase = re.compile('|'.join(alternatives), re.IGNORECASE)
+        return self._pattern
+
+    def match(self, text: str, image=None) -> RouteMatch:
+        pattern = self._pattern or self.compile()
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters lowercase to several (e.g. "İ"), so spans would not line up.
+            pattern, lowered = self._pattern_ignorecase, text
+        keywords, urls, numbers, quoted, algorithms, rounds = set(), [], [], [], [], []
+        for m in pattern.finditer(lowered):
+            kind = m.lastgroup
+            # Spans index the original prompt, which keeps the case of URLs and quoted strings.
+            value = text[m.start(kind):m.end(kind)]
+            if kind == 'keyword':
+                keywords.add(value.lower())
+            elif kind == 'number':
+                numbers.append(value)
+            elif kind == 'url':
+                urls.append(value)
+            elif kind == 'quoted':
+                quoted.append(value)
+            elif kind == 'algorithm':
+                algorithms.append(value.lower())
+            elif kind == 'rounds':
+                rounds.append(int(value))
+
+        candidates = [route for keyword in keywords for route in self._keyword_routes.get(keyword, ())]
+        for trigger, values in (('url', urls), ('number', numbers), ('quoted', quoted), ('algorithm', algorithms), ('rounds', rounds)):
+            if values:
+                candidates.extend(self._trigger_routes.get(trigger, ()))
+        if image is not None:
+            candidates.extend(self._image_routes)
+        chosen = min(candidates, key=self._rank.__getitem__) if candidates else self.fallback
+        return RouteMatch(chosen, text, keywords, urls, numbers, quoted, algorithms, rounds, image)
+
+
+router = Router()
@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import shutil
+import signal
+import asyncio
+import tempfile
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(os.cpu_count() or 2)))
+# Wall-clock and CPU limits per snippet, in seconds.
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "10"))
+SANDBOX_CPU_SECONDS = float(os.getenv("SANDBOX_CPU_SECONDS", "5"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+SANDBOX_MAX_OUTPUT = int(os.getenv("SANDBOX_MAX_OUTPUT", "65536"))
+# A worker is replaced by a fresh one after this many snippets, so state leaked by one run cannot pile up.
+SANDBOX_MAX_RUNS = int(os.getenv("SANDBOX_MAX_RUNS", "50"))
+# Seconds a new worker gets to report ready, and a run waits for an idle worker before failing.
+SANDBOX_START_TIMEOUT = float(os.getenv("SANDBOX_START_TIMEOUT", "30"))
+# Longest pause between attempts to start a worker that keeps failing.
+SPAWN_RETRY_MAX = 30.0
+# Account the workers run as (the server must run as root to switch); empty keeps the server's own.
+SANDBOX_USER = os.getenv("SANDBOX_USER", "")
+
+# Isolated like `python -I`, except that PYTHONHASHSEED is honoured: str/bytes hashes (and so set
+# ordering) are the same in every run, which lets code_cache reuse the output of pure programs.
+# -E would ignore it, so the server's other PYTHON* variables are dropped from the environment instead.
+WORKER_FLAGS = ["-s", "-P"] if sys.version_info >= (3, 11) else ["-s"]
+WORKER_ENV = dict({name: value for name, value in os.environ.items() if not name.startswith("PYTHON")}, PYTHONHASHSEED="0")
+
+
+class SandboxResult:
+    def __init__(self, output: str, error: str = None):
+        self.output = output
+        self.error = error
+
+
+class Worker:
+    def __init__(self, process, workdir: str):
+        self.process = process
+        self.workdir = workdir
+        self.runs = 0
+
+    async def send(self, job: dict):
+        self.process.stdin.write((json.dumps(job) + "\n").encode('utf-8'))
+        await self.process.stdin.drain()
+
+    async def receive(self):
+        line = await self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    def kill(self):
+        if self.process.returncode is None:
+            self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    A pool of pre-started Python worker processes that run generated code in isolation from the
+    server. Workers are spawned and warmed ahead of time (and replaced in the background), so no
+    process start-up happens on the request path. Each run is bounded by a wall-clock timeout,
+    a CPU rlimit, an address-space rlimit and an output size limit; stdout is streamed back.
+    Each worker starts in its own empty temporary directory, so relative paths cannot reach the
+    server's files, and runs as `user` when one is given. Must be used from a single event loop.
+    """
+
+    def __init__(self, size: int = SANDBOX_WORKERS, timeout: float = SANDBOX_TIMEOUT, cpu_seconds: float = SANDBOX_CPU_SECONDS,
+                 memory_mb: int = SANDBOX_MEMORY_MB, max_output: int = SANDBOX_MAX_OUTPUT, max_runs: int = SANDBOX_MAX_RUNS,
+                 user: str = SANDBOX_USER, start_timeout: float = SANDBOX_START_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.max_runs = max_runs
+        self.user = user or None
+        self.start_timeout = start_timeout
+        self.last_error = None
+        self._idle = None
+        self._pending = set()
+
+    def _launch(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._replace()
+
+    async def start(self):
+        """Starts the workers ahead of the first run and waits (up to start_timeout) until they are ready."""
+        if self._idle is None:
+            self._launch()
+            await asyncio.wait(list(self._pending), timeout=self.start_timeout)
+
+    def _replace(self):
+        task = asyncio.ensure_future(self._spawn_until_ready())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _spawn_until_ready(self):
+        # Failed starts are retried with backoff, so the pool recovers by itself instead of shrinking for good.
+        delay = 0.5
+        while True:
+            try:
+                await self._spawn()
+                self.last_error = None
+                return
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"Sandbox worker start failed, retrying in {delay:g}s: {self.last_error}", file=sys.stderr)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SPAWN_RETRY_MAX)
+
+    async def _spawn(self):
+        workdir = tempfile.mkdtemp(prefix="sandbox-")
+        try:
+            group = None
+            if self.user:
+                import pwd
+                group = pwd.getpwnam(self.user).pw_gid
+                shutil.chown(workdir, self.user, group)
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, *WORKER_FLAGS, WORKER_SCRIPT, str(self.memory_mb * 1024 * 1024), env=WORKER_ENV,
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                limit=4 * self.max_output + 65536, cwd=workdir, user=self.user, group=group, extra_groups=[] if self.user else None,
+            )
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        worker = Worker(process, workdir)
+        try:
+            ready = await asyncio.wait_for(worker.receive(), self.start_timeout)
+        except asyncio.TimeoutError:
+            worker.kill()
+            raise RuntimeError(f"Sandbox worker did not report ready within {self.start_timeout:g} seconds")
+        except BaseException:
+            worker.kill()
+            raise
+        if ready is None:
+            worker.kill()
+            raise RuntimeError(f"Sandbox worker exited during start-up (code {await process.wait()})")
+        self._idle.put_nowait(worker)
+
+    async def run(self, code: str, on_output=None) -> SandboxResult:
+        """Runs a snippet in an idle worker. on_output, if given, is called with each chunk of stdout as it arrives."""
+        self._launch()
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), self.start_timeout)
+        except asyncio.TimeoutError:
+            reason = f" (last start failure: {self.last_error})" if self.last_error else ""
+            return SandboxResult('', f"No sandbox worker became available within {self.start_timeout:g} seconds{reason}")
+        output, error, reusable = [], None, False
+        try:
+            await worker.send({"code": code, "cpu_seconds": self.cpu_seconds, "max_output": self.max_output})
+            error, reusable = await asyncio.wait_for(self._collect(worker, output, on_output), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"Execution timed out after {self.timeout:g} seconds"
+        finally:
+            worker.runs += 1
+            if reusable and worker.runs < self.max_runs:
+                self._idle.put_nowait(worker)
+            else:
+                worker.kill()
+                self._replace()
+        return SandboxResult(''.join(output), error)
+
+    async def _collect(self, worker: Worker, output: list, on_output):
+        size = 0
+        while True:
+            frame = await worker.receive()
+            if frame is None:
+                return self._exit_reason(await worker.process.wait()), False
+            if frame.get("done"):
+                return frame.get("error"), True
+            chunk = frame.get("out", "")
+            size += len(chunk)
+            if size > self.max_output:
+                return f"Output exceeded {self.max_output} characters", False
+            output.append(chunk)
+            if on_output is not None:
+                on_output(chunk)
+
+    def _exit_reason(self, returncode: int) -> str:
+        if returncode == -getattr(signal, "SIGXCPU", 0):
+            return f"CPU time limit of {self.cpu_seconds:g} seconds exceeded"
+        return f"Sandbox worker exited unexpectedly (code {returncode})"
+
+    async def close(self):
+        for task in list(self._pending):
+            task.cancel()
+        if self._idle is not None:
+            while not self._idle.empty():
+                self._idle.get_nowait().kill()
+
+
+pool = SandboxPool()
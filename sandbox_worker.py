@@ -0,0 +1,116 @@
+"""
+Worker process for sandbox.SandboxPool. Reads one JSON job per line from its original stdin and
+answers on its original stdout with JSON frames: {"out": text} chunks while the code runs, then
+{"done": true, "error": ...}. The snippet itself sees /dev/null as stdin and an in-process
+writer as stdout, so it cannot corrupt the protocol.
+"""
+import os
+import sys
+import json
+import signal
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are then only enforced by the parent's timeout.
+    resource = None
+
+# Modules generated code commonly uses, imported once so each run starts warm.
+import math, cmath, itertools, functools, collections, fractions, decimal, statistics, string, re, datetime, random, hashlib  # noqa: E401,F401
+
+FRAME_CHUNK = 4096
+
+
+class OutputLimitExceeded(Exception):
+    pass
+
+
+class FrameWriter:
+    """A text stream that forwards writes to the parent as output frames and enforces a size limit."""
+
+    def __init__(self, channel, max_output: int):
+        self.channel = channel
+        self.max_output = max_output
+        self.written = 0
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, text: str) -> int:
+        self.written += len(text)
+        if self.written > self.max_output:
+            raise OutputLimitExceeded(f"Output exceeded {self.max_output} characters")
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= FRAME_CHUNK or '\n' in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            send(self.channel, {"out": ''.join(self.buffer)})
+            self.buffer, self.buffered = [], 0
+
+    def isatty(self):
+        return False
+
+
+def send(channel, frame: dict):
+    channel.write(json.dumps(frame) + "\n")
+    channel.flush()
+
+
+def set_limits(memory_bytes: int):
+    if resource is None:
+        return
+    if memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    # Writes to files fail with an OSError (SIGXFSZ is ignored so they do not kill the worker). This
+    # only limits bytes: creating, truncating or deleting files is left to the worker's empty working
+    # directory and, with SANDBOX_USER, file permissions.
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+
+def set_cpu_budget(seconds: float):
+    """RLIMIT_CPU counts the whole process lifetime, so each job gets `seconds` on top of what is already used."""
+    if resource is None or seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+
+
+def main():
+    memory_bytes = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    jobs = os.fdopen(os.dup(0), 'r')
+    channel = os.fdopen(os.dup(1), 'w')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    sys.stdin = open(os.devnull, 'r')
+    sys.stderr = open(os.devnull, 'w')
+    set_limits(memory_bytes)
+    send(channel, {"ready": True})
+
+    for line in jobs:
+        job = json.loads(line)
+        set_cpu_budget(job.get("cpu_seconds", 0))
+        writer = FrameWriter(channel, job.get("max_output", 65536))
+        sys.stdout = writer
+        error = None
+        try:
+            exec(compile(job["code"], "<generated>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+        except SystemExit:
+            pass
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            sys.stdout = sys.__stdout__
+        try:
+            writer.flush()
+        except Exception:
+            pass
+        send(channel, {"done": True, "error": error})
+
+
+if __name__ == '__main__':
+    main()
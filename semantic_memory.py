@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import asyncio
+import numpy as np
+import metrics
+from embeddings import VectorIndex, build_ivf
+
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "5"))
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.3"))
+# has_vectors() answers from the in-memory index and refreshes it in the background when it is older
+# than this, to pick up vectors other worker processes stored.
+INDEX_REFRESH_SECONDS = 5.0
+# Vectors read from the store and added to the index per step of a sync.
+INDEX_SYNC_CHUNK = 4096
+
+
+class SemanticMemory:
+    """
+    Adds meaning-based recall on top of a MemoryStore. Each fact is embedded once when it is
+    stored; the vectors are persisted next to the facts and mirrored into an in-memory
+    VectorIndex, which is loaded by backfill() and synced incrementally from the store before
+    every search. Must be used from a single event loop.
+    """
+
+    def __init__(self, store, embedder, top_k: int = MEMORY_TOP_K, min_score: float = MEMORY_MIN_SCORE):
+        self.store = store
+        self.embedder = embedder
+        self.top_k = top_k
+        self.min_score = min_score
+        self.index = VectorIndex()
+        self._seen_seq = 0
+        self._synced_at = 0.0
+        self._sync_lock = asyncio.Lock()
+        self._refresh = None
+        self._partitioning = None
+
+    def _load(self, seq: int):
+        # Runs in a worker thread: the SQLite read and decoding the blobs stay off the event loop.
+        rows = self.store.vectors_since(self.embedder.name, seq, INDEX_SYNC_CHUNK)
+        if not rows:
+            return [], None, seq
+        vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        return [row[1] for row in rows], vectors, rows[-1][0]
+
+    async def sync(self):
+        """Adds vectors stored since the last sync to the index, a page at a time; the index is only changed on the loop."""
+        async with self._sync_lock:
+            while True:
+                ids, vectors, seq = await asyncio.to_thread(self._load, self._seen_seq)
+                if not ids:
+                    break
+                self.index.add(ids, vectors)
+                self._seen_seq = seq
+            self._synced_at = time.monotonic()
+        if self.index.needs_partition() and (self._partitioning is None or self._partitioning.done()):
+            self._partitioning = asyncio.ensure_future(self._partition())
+
+    async def _partition(self):
+        # k-means over the whole index takes seconds at this size; searches scan every row (or
+        # keep the previous partition) until the new one is swapped in on the loop.
+        try:
+            centroids, lists = await asyncio.to_thread(build_ivf, self.index.partition_rows())
+            self.index.install_partition(centroids, lists)
+        except Exception as e:
+            print(f"Vector index partition error: {e}", file=sys.stderr)
+
+    async def embed_facts(self, pairs: list):
+        """Embeds (key, fact) pairs in one call and persists their vectors."""
+        if not pairs:
+            return
+        vectors = await self.embedder.embed([fact for _, fact in pairs])
+        blobs = [(key, vector.astype(np.float32).tobytes()) for (key, _), vector in zip(pairs, vectors)]
+        await asyncio.to_thread(self.store.set_vectors, self.embedder.name, blobs)
+        await self.sync()
+
+    async def backfill(self, batch_size: int = 64):
+        """
+        Loads the index, then embeds facts that have no vector for the current embedder (older
+        facts, or a changed model).
+        """
+        try:
+            await self.sync()
+            while True:
+                pairs = await asyncio.to_thread(self.store.missing_vectors, self.embedder.name, batch_size)
+                if not pairs:
+                    break
+                await self.embed_facts(pairs)
+        except Exception as e:
+            print(f"Embedding backfill stopped: {e}", file=sys.stderr)
+
+    def has_vectors(self) -> bool:
+        """Whether any fact has a vector, from the in-memory index; no store round trip."""
+        if time.monotonic() - self._synced_at > INDEX_REFRESH_SECONDS and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.ensure_future(self.sync())
+        return len(self.index) > 0
+
+    async def recall(self, text: str, keyword: str = None, k: int = None, min_score: float = None) -> list:
+        """
+        Returns at most k facts for the question `text`. Facts containing `keyword` (an exact token
+        match from the inverted index) come first, ranked by similarity; the remaining slots go to
+        the nearest facts by meaning that score at least `min_score`.
+        """
+        async with metrics.stage('memory_recall'):
+            k = k or self.top_k
+            min_score = self.min_score if min_score is None else min_score
+            try:
+                query_vector = (await self.embedder.embed([text]))[0]
+            except Exception as e:
+                print(f"Embedding error for recall query: {e}", file=sys.stderr)
+                query_vector = None
+            await self.sync()
+
+            ranked = {}
+            if keyword:
+                ids = await asyncio.to_thread(self.store.match_ids, keyword)
+                scores = self.index.score(ids, query_vector) if query_vector is not None else {}
+                for fact_id in ids:
+                    ranked[fact_id] = 1.0 + scores.get(fact_id, 0.0)
+            if query_vector is not None:
+                for fact_id, score in self.index.search(query_vector, k)[0]:
+                    if score >= min_score:
+                        ranked.setdefault(fact_id, score)
+
+            top_ids = sorted(ranked, key=ranked.get, reverse=True)[:k]
+            facts = await asyncio.to_thread(self.store.get_many, top_ids)
+            return [facts[i] for i in top_ids if i in facts]
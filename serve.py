@@ -0,0 +1,178 @@
+"""
+Production launcher: binds the listening socket once, then forks worker processes that each load
+the app and accept connections from that socket. Workers that die are restarted; SIGTERM or
+SIGINT stops them all.
+
+    python serve.py --workers 4 --port 8080
+"""
+import os
+import sys
+import time
+import errno
+import atexit
+import signal
+import socket
+import argparse
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8080"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(os.cpu_count() or 1)))
+SERVE_BACKLOG = int(os.getenv("SERVE_BACKLOG", "1024"))
+# Seconds stopping workers get to finish before they are killed.
+SERVE_GRACE = float(os.getenv("SERVE_GRACE", "10"))
+# Pools each worker starts, with their totals across all workers; unless set, each worker gets
+# an equal share (at least one).
+PER_WORKER_POOLS = {
+    "SANDBOX_WORKERS": os.cpu_count() or 1,
+    "HASH_WORKERS": os.cpu_count() or 1,
+    "BROWSER_POOL_SIZE": 2,
+}
+
+
+def listen(host: str, port: int, backlog: int = SERVE_BACKLOG) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+_stopping = False
+
+
+def _stop_worker(*_):
+    # A second signal (e.g. Ctrl-C reaching the whole group, then the supervisor's SIGTERM) must
+    # not interrupt the shutdown the first one started.
+    global _stopping
+    if not _stopping:
+        _stopping = True
+        sys.exit(0)
+
+
+def run_worker(sock: socket.socket, host: str, port: int):
+    """Runs in the forked child: loads the app and serves until told to stop. Never returns."""
+    status = 0
+    # Its own process group, so a kill after SERVE_GRACE also reaches the pool processes it forks.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, _stop_worker)
+    signal.signal(signal.SIGINT, _stop_worker)
+    try:
+        # The app is imported after the fork, so every worker has its own event loop, threads and pools.
+        from werkzeug.serving import make_server
+        import app
+        server = make_server(host, port, app.app, threaded=True, fd=sock.fileno())
+        # Only non-daemon request threads are tracked, and server_close() waits for those.
+        server.daemon_threads = False
+        try:
+            server.serve_forever()
+        finally:
+            # Stops accepting and waits for in-flight requests; the supervisor kills us after SERVE_GRACE.
+            server.server_close()
+    except SystemExit as e:
+        status = e.code or 0
+    except BaseException as e:
+        print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+        status = 1
+    # Close the app (memory store, pools) here; the child must not unwind into the supervisor's code.
+    atexit._run_exitfuncs()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(status)
+
+
+class Supervisor:
+    def __init__(self, sock: socket.socket, host: str, port: int, workers: int):
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.children = {}
+        self.stopping = False
+        self.deadline = None
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.host, self.port)
+        # Also set here, so the group exists even if the worker is killed before it gets to it.
+        try:
+            os.setpgid(pid, pid)
+        except (PermissionError, ProcessLookupError):
+            pass
+        self.children[pid] = time.monotonic()
+
+    def stop(self, *_):
+        if not self.stopping:
+            self.stopping = True
+            self.deadline = time.monotonic() + SERVE_GRACE
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"Serving on {self.host}:{self.port} with {self.workers} workers (pid {os.getpid()})")
+        while self.children:
+            # Polled rather than blocking: a blocking waitpid() is retried after the signal handler
+            # runs, so the grace deadline could only be checked once some worker exited by itself.
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if self.stopping and time.monotonic() > self.deadline:
+                    for child in self.children:
+                        try:
+                            os.killpg(child, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                time.sleep(0.1)
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            if time.monotonic() - started < 1:
+                # A worker that dies on startup would otherwise be restarted in a tight loop.
+                time.sleep(1)
+            self.spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=SERVE_HOST)
+    parser.add_argument('--port', type=int, default=SERVE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS)
+    parser.add_argument('--no-migrate', action='store_true', help="do not import the old shelve memory file at startup")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    for name, total in PER_WORKER_POOLS.items():
+        os.environ.setdefault(name, str(max(1, total // workers)))
+
+    # Imported facts are written once, here, before any worker opens the store.
+    import migrate_shelve
+    if not args.no_migrate:
+        store = migrate_shelve.MemoryStore()
+        try:
+            migrate_shelve.migrate_on_startup(store)
+        finally:
+            store.close()
+
+    try:
+        sock = listen(args.host, args.port)
+    except OSError as e:
+        if e.errno == errno.EADDRINUSE:
+            sys.exit(f"Port {args.port} is already in use")
+        raise
+    Supervisor(sock, args.host, args.port, workers).run()
+
+
+if __name__ == '__main__':
+    main()
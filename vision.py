@@ -0,0 +1,102 @@
+import io
+import os
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from llm import client, disk_cache, ModelGate
+from response_cache import ResponseCache, make_key
+
+VISION_MODEL = os.getenv("VISION_MODEL", "moondream")
+# Longest side of the image sent to the model. moondream looks at 378px crops, so larger inputs
+# only cost bandwidth and decode time on the Ollama side.
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "756"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+# Vision calls (preprocessing plus the model call) get their own slots and wait queue, so a burst
+# of images cannot occupy the threads and queue positions text requests need.
+VISION_WORKERS = int(os.getenv("VISION_WORKERS", "2"))
+VISION_MAX_INFLIGHT = int(os.getenv("VISION_MAX_INFLIGHT", "2"))
+VISION_MAX_QUEUE = int(os.getenv("VISION_MAX_QUEUE", "16"))
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "256"))
+VISION_CACHE_TTL = float(os.getenv("VISION_CACHE_TTL", "86400"))
+
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP', 'BMP', 'TIFF'}
+# Formats the model accepts as they are; small images in them are forwarded untouched.
+PASSTHROUGH_FORMATS = {'JPEG', 'PNG'}
+
+
+class ImageError(ValueError):
+    pass
+
+
+def inspect(data: bytes):
+    """Opens an image reading only its header (format and size); pixels are not decoded."""
+    from PIL import Image
+    if len(data) > IMAGE_MAX_BYTES:
+        raise ImageError(f"Image is larger than {IMAGE_MAX_BYTES} bytes")
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        raise ImageError("Unrecognized image data")
+    if image.format not in ACCEPTED_FORMATS:
+        raise ImageError(f"Unsupported image format: {image.format}")
+    width, height = image.size
+    if not width or not height or width * height > IMAGE_MAX_PIXELS:
+        raise ImageError(f"Unsupported image dimensions: {width}x{height}")
+    return image
+
+
+def prepare(data: bytes, max_side: int = IMAGE_MAX_SIDE) -> bytes:
+    """Returns the image bytes to send to the model: small JPEG/PNG as they are, everything else downscaled to a JPEG."""
+    image = inspect(data)
+    if image.format in PASSTHROUGH_FORMATS and max(image.size) <= max_side:
+        return data
+    try:
+        if image.format == 'JPEG':
+            # Lets the JPEG decoder skip straight to a reduced scale instead of decoding full size.
+            image.draft('RGB', (max_side, max_side))
+        image.thumbnail((max_side, max_side))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=90)
+    except Exception as e:
+        raise ImageError(f"Could not decode image: {e}")
+    return out.getvalue()
+
+
+class VisionPipeline:
+    """
+    Answers prompts about images. The answer is cached by (image content hash, prompt), so a
+    repeated image is neither decoded nor sent again. Preprocessing runs on the pipeline's own
+    threads, and calls go through a bounded gate that raises llm.Overloaded when its queue is full.
+    """
+
+    def __init__(self, model: str = VISION_MODEL, max_side: int = IMAGE_MAX_SIDE, workers: int = VISION_WORKERS,
+                 max_inflight: int = VISION_MAX_INFLIGHT, max_queue: int = VISION_MAX_QUEUE, cache: ResponseCache = None):
+        self.model = model
+        self.max_side = max_side
+        self.cache = cache
+        self.gate = ModelGate(max_inflight, max_queue, "vision")
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="vision")
+
+    async def describe(self, image_bytes: bytes, prompt: str) -> str:
+        if self.cache is None:
+            return await self._describe(image_bytes, prompt)
+        key = make_key(self.model, self.max_side, hashlib.sha256(image_bytes).hexdigest(), prompt)
+        return await self.cache.get_or_compute(key, lambda: self._describe(image_bytes, prompt))
+
+    async def _describe(self, image_bytes: bytes, prompt: str) -> str:
+        async with self.gate:
+            async with metrics.stage('image_prepare'):
+                prepared = await asyncio.get_running_loop().run_in_executor(self._executor, prepare, image_bytes, self.max_side)
+            response = await client.chat(model=self.model, messages=[{'role': 'user', 'content': prompt, 'images': [prepared]}])
+        return response['message']['content']
+
+    def stats(self) -> dict:
+        return {"in_flight": self.gate.in_flight, "waiting": self.gate.waiting, "cache": self.cache.stats() if self.cache else None}
+
+
+vision_cache = ResponseCache("vision", VISION_CACHE_SIZE, VISION_CACHE_TTL, disk_cache) if VISION_CACHE_SIZE > 0 else None
+pipeline = VisionPipeline(cache=vision_cache)